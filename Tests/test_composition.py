@@ -0,0 +1,252 @@
+import unittest
+import os
+import json
+import random
+import tempfile
+import numpy as np
+import qualreas as qr
+
+__author__ = 'Alfred J. Reich'
+
+
+class TestComposition(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Load all of the existing algebras
+        """
+        path = os.path.join(os.getenv('PYPROJ'), 'qualreas/Algebras')
+        self.algebras = [qr.Algebra(os.path.join(path, file_name))
+                         for file_name in sorted(os.listdir(path)) if file_name.endswith('.json')]
+        self.random = random.Random(1234)
+
+    def random_relsets(self, alg, count):
+        num_rels = len(alg.elements)
+        return [alg.elements_bitset.fromint(self.random.getrandbits(num_rels)) for _ in range(count)]
+
+    @staticmethod
+    def compose_by_element(alg, relset1, relset2):
+        """Compose two relsets directly from the transitivity table, one pair of relations at a time."""
+        result = alg.elements_bitset.infimum
+        for r1 in relset1:
+            for r2 in relset2:
+                result = result.union(alg.transitivity_table[r1][r2])
+        return result
+
+    def test_compose_singletons(self):
+        for alg in self.algebras:
+            with self.subTest(algebra=alg.name):
+                for r1 in alg.elements:
+                    for r2 in alg.elements:
+                        self.assertEqual(alg.compose(alg.relset(r1), alg.relset(r2)),
+                                         alg.transitivity_table[r1][r2])
+
+    def test_compose_relsets(self):
+        for alg in self.algebras:
+            with self.subTest(algebra=alg.name):
+                relsets = self.random_relsets(alg, 200)
+                for relset1, relset2 in zip(relsets, reversed(relsets)):
+                    self.assertEqual(alg.compose(relset1, relset2),
+                                     self.compose_by_element(alg, relset1, relset2))
+
+    def test_compose_empty_and_universal(self):
+        for alg in self.algebras:
+            with self.subTest(algebra=alg.name):
+                empty = alg.elements_bitset.infimum
+                self.assertEqual(alg.compose(empty, alg.elements), empty)
+                self.assertEqual(alg.compose(alg.elements, empty), empty)
+                self.assertEqual(alg.compose(alg.elements, alg.elements),
+                                 self.compose_by_element(alg, alg.elements, alg.elements))
+
+    def test_converse(self):
+        for alg in self.algebras:
+            with self.subTest(algebra=alg.name):
+                for relset in self.random_relsets(alg, 200) + [alg.elements, alg.elements_bitset.infimum]:
+                    expected = alg.relset([alg.converse(rel) for rel in relset.members()])
+                    self.assertEqual(alg.converse(relset), expected)
+                    self.assertEqual(alg.converse(alg.converse(relset)), relset)
+
+    def test_full_composition_table(self):
+        for alg in self.algebras:
+            with self.subTest(algebra=alg.name):
+                if len(alg.elements) <= qr.FULL_TABLE_MAX_ELEMENTS:
+                    num_relsets = 2 ** len(alg.elements)
+                    self.assertEqual(alg.full_composition_table.shape, (num_relsets, num_relsets))
+                    self.assertIsNone(alg.composition_chunks)
+                else:
+                    self.assertIsNone(alg.full_composition_table)
+                self.assertGreater(alg.composition_table_nbytes, 0)
+
+    def test_full_and_chunked_tables_agree(self):
+        for alg in self.algebras:
+            if len(alg.elements) <= qr.FULL_TABLE_MAX_ELEMENTS:
+                with self.subTest(algebra=alg.name):
+                    chunked = qr.Algebra(alg_dict=alg.algebra_dict, full_table_max_elements=0)
+                    self.assertIsNone(chunked.full_composition_table)
+                    num_relsets = 2 ** len(alg.elements)
+                    for mask1 in range(0, num_relsets, 3):
+                        for mask2 in range(0, num_relsets, 5):
+                            self.assertEqual(alg.compose_masks(mask1, mask2),
+                                             chunked.compose_masks(mask1, mask2))
+
+    def test_many_operations(self):
+        for alg in self.algebras:
+            with self.subTest(algebra=alg.name):
+                masks1 = np.array(self.random_relsets(alg, 300), dtype=alg.mask_dtype).reshape(20, 15)
+                masks2 = np.array(self.random_relsets(alg, 300), dtype=alg.mask_dtype).reshape(20, 15)
+                composed = alg.compose_many(masks1, masks2)
+                conversed = alg.converse_many(masks1)
+                intersected = alg.intersect_many(masks1, masks2)
+                for array in (composed, conversed, intersected):
+                    self.assertEqual(array.dtype, alg.mask_dtype)
+                    self.assertEqual(array.shape, masks1.shape)
+                for (row, col), mask1 in np.ndenumerate(masks1):
+                    relset1 = alg.elements_bitset.fromint(int(mask1))
+                    relset2 = alg.elements_bitset.fromint(int(masks2[row, col]))
+                    self.assertEqual(composed[row, col], alg.compose(relset1, relset2))
+                    self.assertEqual(conversed[row, col], alg.converse(relset1))
+                    self.assertEqual(intersected[row, col], relset1 + relset2)
+
+    @staticmethod
+    def group_algebra(n):
+        """The algebra of the cyclic group of order n, where Ri;Rj = R(i+j mod n)."""
+        def name(i):
+            return f"R{i % n}"
+        relations = {name(i): {"Name": name(i), "Domain": ["Point"], "Range": ["Point"], "Converse": name(-i),
+                               "Reflexive": i == 0, "Symmetric": (2 * i) % n == 0, "Transitive": i == 0}
+                     for i in range(n)}
+        table = {name(i): {name(j): name(i + j) for j in range(n)} for i in range(n)}
+        return qr.Algebra(alg_dict={"Name": f"Z{n}", "Relations": relations, "TransTable": table})
+
+    def test_more_than_64_relations(self):
+        alg = self.group_algebra(70)
+        self.assertEqual(alg.mask_dtype, object)
+        relsets = self.random_relsets(alg, 40)
+        for relset1, relset2 in zip(relsets, reversed(relsets)):
+            self.assertEqual(alg.compose(relset1, relset2), self.compose_by_element(alg, relset1, relset2))
+        masks = np.array([int(relset) for relset in relsets], dtype=object)
+        self.assertEqual(alg.compose_many(masks, masks[::-1]).tolist(),
+                         [alg.compose_masks(int(relset1), int(relset2))
+                          for relset1, relset2 in zip(relsets, reversed(relsets))])
+        self.assertEqual(alg.converse_many(masks).tolist(), [int(alg.converse(relset)) for relset in relsets])
+        self.assertTrue(alg.check_composition_identity())
+        points = [qr.TemporalEntity(["Point"], f"P{i}") for i in range(4)]
+        results = []
+        for method in ("sweep", "queue", "vectorized"):
+            net = qr.Network(alg, "Cycle")
+            net.add_constraint(points[0], points[1], "R1|R2")
+            net.add_constraint(points[1], points[2], "R3")
+            net.add_constraint(points[2], points[3], "R5|R69")
+            self.assertTrue(net.propagate(method=method))
+            results.append(net.get_constraint("P0", "P3"))
+        self.assertEqual(results, ["R3|R4|R9|R10"] * 3)
+        with tempfile.TemporaryDirectory() as compiled_dir:
+            with self.assertRaises(ValueError):
+                alg.compile(os.path.join(compiled_dir, alg.name))
+
+    def test_compiled_algebras(self):
+        with tempfile.TemporaryDirectory() as compiled_dir:
+            for alg in self.algebras:
+                with self.subTest(algebra=alg.name):
+                    compiled_path = os.path.join(compiled_dir, alg.name)
+                    alg.compile(compiled_path)
+                    compiled = qr.Algebra(compiled_path=compiled_path)
+                    self.assertEqual(compiled.name, alg.name)
+                    self.assertEqual(compiled.universal_is_absorbing, alg.universal_is_absorbing)
+                    self.assertEqual(compiled.composition_table_nbytes, alg.composition_table_nbytes)
+                    self.assertEqual(compiled.transitivity_table, alg.transitivity_table)
+                    relsets = self.random_relsets(alg, 100)
+                    for relset1, relset2 in zip(relsets, reversed(relsets)):
+                        self.assertEqual(compiled.compose(relset1, relset2), alg.compose(relset1, relset2))
+                        self.assertEqual(compiled.converse(relset1), alg.converse(relset1))
+                    masks = np.array(relsets, dtype=alg.mask_dtype)
+                    np.testing.assert_array_equal(compiled.compose_many(masks, masks[::-1]),
+                                                  alg.compose_many(masks, masks[::-1]))
+            # An algebra compiled with different tables isn't loaded
+            header_path = os.path.join(compiled_dir, self.algebras[0].name, qr.COMPILED_ALGEBRA_HEADER)
+            with open(header_path) as header_file:
+                header = json.load(header_file)
+            for key, value in (("Version", qr.COMPILED_ALGEBRA_VERSION + 1), ("ChunkBits", qr.CHUNK_BITS * 2)):
+                with self.subTest(header=key):
+                    with open(header_path, 'w') as header_file:
+                        json.dump(dict(header, **{key: value}), header_file)
+                    with self.assertRaises(ValueError):
+                        qr.Algebra(compiled_path=os.path.dirname(header_path))
+
+    def test_composition_identity(self):
+        for alg in self.algebras:
+            with self.subTest(algebra=alg.name):
+                self.assertTrue(alg.check_composition_identity())
+                if len(alg.elements) <= qr.FULL_TABLE_MAX_ELEMENTS:
+                    self.assertTrue(alg.check_composition_identity(exhaustive=True))
+
+    def test_is_associative(self):
+        not_associative = {'Extended_Linear_Interval_Algebra', 'Left_Branching_Interval_Algebra',
+                           'Right_Branching_Interval_Algebra', 'Left_Binary_Branching_Point_Algebra',
+                           'Right_Binary_Branching_Point_Algebra'}
+        for alg in self.algebras:
+            if not alg.name.startswith('Derived'):
+                with self.subTest(algebra=alg.name):
+                    self.assertEqual(alg.is_associative(), alg.name not in not_associative)
+                    if len(alg.elements) <= qr.FULL_TABLE_MAX_ELEMENTS:
+                        self.assertEqual(alg.is_associative(exhaustive=True), alg.name not in not_associative)
+                    else:
+                        with self.assertRaises(ValueError):
+                            alg.is_associative(exhaustive=True)
+
+    def test_derive_composition_table_workers(self):
+        path = os.path.join(os.getenv('PYPROJ'), 'qualreas/Algebras')
+        point_alg = qr.Algebra(os.path.join(path, 'Linear_Point_Algebra.json'))
+        derived_alg = qr.Algebra(os.path.join(path, 'test_derived_allen_algebra.json'))
+        rels = sorted(derived_alg.rel_info_dict.keys())
+        serial = qr.derive_composition_table(point_alg, "<", rels)
+        parallel = qr.derive_composition_table(point_alg, "<", rels, workers=2)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(list(parallel), list(serial))
+        self.assertEqual(serial, derived_alg.algebra_dict["TransTable"])
+        # Giving workers selects the network-based derivation
+        derived = qr.derive_algebra(point_alg, "<", workers=2)
+        self.assertEqual(derived["TransTable"], serial)
+        self.assertEqual(derived, qr.derive_algebra(point_alg, "<"))
+        with self.assertRaises(ValueError):
+            qr.derive_algebra(point_alg, "<", workers=2, by_orderings=True)
+
+    def test_derive_composition_table_by_orderings(self):
+        path = os.path.join(os.getenv('PYPROJ'), 'qualreas/Algebras')
+        for point_alg_name, less_than_rel, derived_alg_name in [
+                ('Linear_Point_Algebra', '<', 'test_derived_allen_algebra'),
+                ('Linear_Point_Algebra', '=|<', 'test_derived_extended_interval_algebra'),
+                ('Right_Branching_Point_Algebra', '=|<', 'test_derived_right_branching_interval_algebra')]:
+            with self.subTest(algebra=derived_alg_name):
+                point_alg = qr.Algebra(os.path.join(path, point_alg_name + '.json'))
+                derived_alg = qr.Algebra(os.path.join(path, derived_alg_name + '.json'))
+                rels = sorted(derived_alg.rel_info_dict.keys())
+                by_orderings = qr.derive_composition_table_by_orderings(point_alg, less_than_rel, rels)
+                self.assertEqual(by_orderings, qr.derive_composition_table(point_alg, less_than_rel, rels))
+                self.assertEqual(by_orderings, derived_alg.algebra_dict["TransTable"])
+
+    def test_derive_algebra_cache(self):
+        path = os.path.join(os.getenv('PYPROJ'), 'qualreas/Algebras')
+        point_alg = qr.Algebra(os.path.join(path, 'Linear_Point_Algebra.json'))
+        uncached = qr.derive_algebra(point_alg, '<', name="Derived")
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = qr.derive_algebra(point_alg, '<', name="Derived", cache_dir=cache_dir)
+            cache_file = os.path.join(cache_dir, qr.derived_algebra_cache_key(point_alg, '<') + '.json')
+            self.assertTrue(os.path.exists(cache_file))
+            # Only the cache file and the directory's lock file are left behind
+            self.assertEqual(sorted(os.listdir(cache_dir)), ['.lock', os.path.basename(cache_file)])
+            second = qr.derive_algebra(point_alg, '<', name="Derived", cache_dir=cache_dir)
+            self.assertEqual(first, uncached)
+            self.assertEqual(second, uncached)
+            # A different less-than relation is a different entry
+            self.assertNotEqual(qr.derived_algebra_cache_key(point_alg, '=|<'),
+                                qr.derived_algebra_cache_key(point_alg, '<'))
+            # A corrupted entry is derived again
+            with open(cache_file, 'w') as out:
+                out.write('{"Key": ')
+            self.assertEqual(qr.derive_algebra(point_alg, '<', name="Derived", cache_dir=cache_dir), uncached)
+            self.assertIsNotNone(qr.read_cached_derivation(cache_file, qr.derived_algebra_cache_key(point_alg, '<')))
+
+
+if __name__ == '__main__':
+    unittest.main()
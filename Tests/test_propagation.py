@@ -0,0 +1,557 @@
+import unittest
+from unittest import mock
+import os
+import networkx as nx
+import qualreas as qr
+
+__author__ = 'Alfred J. Reich'
+
+
+class TestPropagation(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Load the algebras and the example networks used below
+        """
+        path = os.path.join(os.getenv('PYPROJ'), 'qualreas')
+        self.alg_path = os.path.join(path, 'Algebras')
+        self.net_path = os.path.join(path, 'Networks')
+        self.alg0 = qr.Algebra(os.path.join(self.alg_path, 'Linear_Interval_Algebra.json'))
+        self.alg1 = qr.Algebra(os.path.join(self.alg_path, 'Extended_Linear_Interval_Algebra.json'))
+        self.alg4 = qr.Algebra(os.path.join(self.alg_path, 'RCC8_Algebra.json'))
+
+    def load_network(self, file_name):
+        return qr.Network(algebra_path=self.alg_path,
+                          json_file_name=os.path.join(self.net_path, file_name))
+
+    def example_networks(self):
+        return ['BookExample.json', 'BookExampleExtended.json', 'Figure_5_in_Allens_1983_paper.json',
+                'golumbic1993_example_2_5.json', 'golumbic1993_example_2_6.json',
+                'janhunen2019_example_fig_1.json', 'rcc8_example.json']
+
+    def book_example(self, algebra, classes):
+        ents = {name: qr.TemporalEntity(classes, name) for name in "IJKL"}
+        net = qr.Network(algebra, "Book Example")
+        net.add_constraint(ents["I"], ents["J"], "F|FI")
+        net.add_constraint(ents["I"], ents["L"], "S|M")
+        net.add_constraint(ents["L"], ents["J"], "S|M")
+        net.add_constraint(ents["K"], ents["I"], "D|DI")
+        net.add_constraint(ents["K"], ents["J"], "D|DI")
+        net.add_constraint(ents["L"], ents["K"], "O")
+        return net
+
+    def assert_same_propagation(self, make_network, method):
+        net_sweep = make_network()
+        net_other = make_network()
+        consistent = net_sweep.propagate()
+        self.assertEqual(consistent, net_other.propagate(method=method))
+        # An inconsistent network is left partially propagated, so only compare consistent ones
+        if consistent:
+            self.assertEqual(net_sweep.to_list(), net_other.to_list())
+
+    def test_queue_propagation_examples(self):
+        for file_name in self.example_networks():
+            with self.subTest(network=file_name):
+                self.assert_same_propagation(lambda: self.load_network(file_name), "queue")
+
+    def test_queue_propagation_book_example(self):
+        self.assert_same_propagation(lambda: self.book_example(self.alg0, ["ProperInterval"]), "queue")
+        self.assert_same_propagation(lambda: self.book_example(self.alg1, ["Point", "ProperInterval"]),
+                                     "queue")
+
+    def test_vectorized_propagation_examples(self):
+        for file_name in self.example_networks():
+            with self.subTest(network=file_name):
+                self.assert_same_propagation(lambda: self.load_network(file_name), "vectorized")
+
+    def test_vectorized_propagation_book_example(self):
+        self.assert_same_propagation(lambda: self.book_example(self.alg0, ["ProperInterval"]), "vectorized")
+        self.assert_same_propagation(lambda: self.book_example(self.alg1, ["Point", "ProperInterval"]),
+                                     "vectorized")
+
+    def test_queue_propagation_inconsistent(self):
+        x = qr.TemporalEntity(["ProperInterval"], "X")
+        y = qr.TemporalEntity(["ProperInterval"], "Y")
+        z = qr.TemporalEntity(["ProperInterval"], "Z")
+        net = qr.Network(self.alg0, "Inconsistent")
+        net.add_constraint(x, y, "B")
+        net.add_constraint(y, z, "B")
+        net.add_constraint(z, x, "B")
+        self.assertFalse(net.propagate(method="queue"))
+        self.assertFalse(net.to_matrix().propagate(method="vectorized"))
+
+    def test_queue_propagation_empty_constraint(self):
+        net = self.book_example(self.alg0, ["ProperInterval"])
+        net.set_constraint(net.get_entity("I"), net.get_entity("J"), self.alg0.elements_bitset.infimum)
+        self.assertFalse(net.propagate(method="queue"))
+
+    def test_vectorized_propagation_inconsistent(self):
+        x = qr.TemporalEntity(["ProperInterval"], "X")
+        y = qr.TemporalEntity(["ProperInterval"], "Y")
+        z = qr.TemporalEntity(["ProperInterval"], "Z")
+        # Propagation can't change a constraint that's already empty
+        net = qr.Network(self.alg0, "Empty")
+        net.add_constraint(x, y, "B")
+        net.set_constraint(x, y, self.alg0.elements_bitset.infimum)
+        self.assertFalse(net.propagate(method="vectorized"))
+        # An inconsistent network isn't emptied out
+        net = qr.Network(self.alg0, "Inconsistent")
+        net.add_constraint(x, y, "B")
+        net.add_constraint(y, z, "B")
+        net.add_constraint(z, x, "B")
+        self.assertFalse(net.propagate(method="vectorized"))
+        self.assertTrue(all(cons for _, _, cons in net.edges(data='constraint')))
+
+    def test_constraint_matrix_propagation(self):
+        for file_name in self.example_networks():
+            with self.subTest(network=file_name):
+                net = self.load_network(file_name)
+                cmat = self.load_network(file_name).to_matrix()
+                cmat_vec = self.load_network(file_name).to_matrix()
+                consistent = net.propagate()
+                self.assertEqual(consistent, cmat.propagate())
+                self.assertEqual(consistent, cmat_vec.propagate(method="vectorized"))
+                if consistent:
+                    self.assertEqual(net.to_list(), cmat.to_list())
+                    self.assertEqual(net.to_list(), cmat_vec.to_list())
+                    self.assertEqual(net.to_list(), cmat.to_network().to_list())
+
+    def test_constraint_matrix_batch_propagation(self):
+        # These networks all use the Linear Interval Algebra
+        file_names = ['BookExample.json', 'Figure_5_in_Allens_1983_paper.json', 'golumbic1993_example_2_5.json',
+                      'golumbic1993_example_2_6.json', 'janhunen2019_example_fig_1.json']
+        cmats = [self.load_network(file_name).to_matrix() for file_name in file_names]
+        expected = [self.load_network(file_name).to_matrix() for file_name in file_names]
+        for _ in range(3):
+            cmats.append(self.book_example(cmats[0].algebra, ["ProperInterval"]).to_matrix())
+            expected.append(self.book_example(cmats[0].algebra, ["ProperInterval"]).to_matrix())
+        consistent = qr.ConstraintMatrix.propagate_batch(cmats)
+        self.assertEqual(consistent, [cmat.propagate(method="vectorized") for cmat in expected])
+        for cmat, cmat_expected, flag in zip(cmats, expected, consistent):
+            if flag:
+                self.assertEqual(cmat.to_list(), cmat_expected.to_list())
+        with self.assertRaises(ValueError):
+            qr.ConstraintMatrix.propagate_batch([cmats[0], self.load_network('rcc8_example.json').to_matrix()])
+
+    def test_constraint_matrix_storage(self):
+        x = qr.TemporalEntity(["ProperInterval"], "X")
+        y = qr.TemporalEntity(["ProperInterval"], "Y")
+        cmat = qr.ConstraintMatrix(self.alg0)
+        cmat.add_constraint(x, y, "B|M")
+        self.assertEqual(cmat.matrix.shape, (2, 2))
+        self.assertEqual(cmat.matrix.dtype, self.alg0.mask_dtype)
+        self.assertEqual(cmat.get_constraint("X", "Y"), "B|M")
+        self.assertEqual(cmat.get_constraint("Y", "X"), "BI|MI")
+        self.assertEqual(cmat.get_constraint("X", "X"), "E")
+        self.assertIs(cmat.get_entity("Y"), y)
+        with self.assertRaises(ValueError):
+            cmat.add_entity(qr.TemporalEntity(["ProperInterval"], "X"))
+
+    def test_assert_constraint(self):
+        for file_name in self.example_networks():
+            with self.subTest(network=file_name):
+                net_dict = self.load_network(file_name).to_dict()
+                algebra = self.load_network(file_name).algebra
+                node_classes = dict(net_dict["nodes"])
+                for count in range(1, len(net_dict["edges"]) + 1):
+                    partial_dict = dict(net_dict, edges=net_dict["edges"][:count])
+                    if count == 1:
+                        incremental = qr.Network(algebra=algebra, network_dict=partial_dict)
+                        self.assertTrue(incremental.propagate())
+                        continue
+                    tail_name, head_name, constraint = net_dict["edges"][count - 1]
+                    full = qr.Network(algebra=algebra, network_dict=partial_dict)
+                    consistent = full.propagate()
+                    entities = [incremental.get_entity(name) or
+                                qr.class_type_dict[node_classes[name][0]](node_classes[name], name)
+                                for name in (tail_name, head_name)]
+                    self.assertEqual(consistent, incremental.assert_constraint(*entities, constraint))
+                    if not consistent:
+                        break
+                    names = [node.name for node in full.nodes]
+                    self.assertEqual([[full.get_constraint(n1, n2) for n2 in names] for n1 in names],
+                                     [[incremental.get_constraint(n1, n2) for n2 in names] for n1 in names])
+
+    def test_assert_constraint_unpropagated(self):
+        ents = {name: qr.TemporalEntity(["ProperInterval"], name) for name in "WXYZ"}
+        net = qr.Network(self.alg0, "Unpropagated")
+        net.add_constraint(ents["X"], ents["Y"], "B|M")
+        net.add_constraint(ents["Y"], ents["Z"], "B|M")
+        self.assertTrue(net.propagate())
+        # W is added, without propagating, so it has no edges to X or Y
+        net.add_constraint(ents["Z"], ents["W"], "B")
+        self.assertTrue(net.assert_constraint(ents["Y"], ents["Z"], "B"))
+        self.assertEqual(net.get_constraint("X", "W"), "B")
+        self.assertEqual(net.get_constraint("W", "Y"), "BI")
+
+    def test_assert_constraint_matrix(self):
+        x = qr.TemporalEntity(["ProperInterval"], "X")
+        y = qr.TemporalEntity(["ProperInterval"], "Y")
+        z = qr.TemporalEntity(["ProperInterval"], "Z")
+        cmat = qr.ConstraintMatrix(self.alg0)
+        self.assertTrue(cmat.assert_constraint(x, y, "B"))
+        self.assertTrue(cmat.assert_constraint(y, z, "B|M"))
+        self.assertEqual(cmat.get_constraint("X", "Z"), "B")
+        self.assertEqual(cmat.get_constraint("Z", "X"), "BI")
+        self.assertFalse(cmat.assert_constraint(z, x, "B"))
+
+    def test_entity_name_index(self):
+        net = self.book_example(self.alg0, ["ProperInterval"])
+        entity_i = net.get_entity("I")
+        self.assertEqual(entity_i.name, "I")
+        self.assertIsNone(net.get_entity("No Such Entity"))
+        self.assertEqual(net.get_edge("I", "J"), ("I", "J", "F|FI"))
+        other = self.book_example(self.alg0, ["ProperInterval"])
+        with self.assertWarns(UserWarning):
+            combined = net + other
+        self.assertIn(combined.get_entity("I"), (entity_i, other.get_entity("I")))
+        first_i = combined.get_entity("I")
+        combined.remove_node(first_i)
+        self.assertIsNotNone(combined.get_entity("I"))
+        self.assertIsNot(combined.get_entity("I"), first_i)
+        net.remove_node(entity_i)
+        self.assertIsNone(net.get_entity("I"))
+
+    def test_sparse_propagation_examples(self):
+        for file_name in self.example_networks():
+            for method in ("queue", "vectorized"):
+                with self.subTest(network=file_name, method=method):
+                    dense = self.load_network(file_name)
+                    sparse = qr.Network(algebra_path=self.alg_path, sparse=True,
+                                        json_file_name=os.path.join(self.net_path, file_name))
+                    consistent = dense.propagate()
+                    self.assertEqual(consistent, sparse.propagate(method=method))
+                    if consistent:
+                        self.assertEqual(dense.to_list(), sparse.to_list())
+                        universal = sparse.algebra.elements
+                        self.assertTrue(all(sparse.edges[tail, head]['constraint'] != universal
+                                            for tail, head in sparse.edges if tail != head))
+
+    def test_sparse_assert_constraint(self):
+        x = qr.TemporalEntity(["ProperInterval"], "X")
+        y = qr.TemporalEntity(["ProperInterval"], "Y")
+        z = qr.TemporalEntity(["ProperInterval"], "Z")
+        w = qr.TemporalEntity(["ProperInterval"], "W")
+        net = qr.Network(self.alg0, "Sparse", sparse=True)
+        self.assertTrue(net.assert_constraint(x, y, "B"))
+        self.assertTrue(net.assert_constraint(z, w, "O"))
+        self.assertFalse(net.has_edge(x, z))
+        self.assertEqual(net.get_constraint("X", "Z"), str(net.algebra.elements))
+        self.assertTrue(net.assert_constraint(y, z, "M"))
+        self.assertEqual(net.get_constraint("X", "W"), "B")
+        self.assertFalse(net.assert_constraint(w, x, "B|M"))
+        with self.assertRaisesRegex(ValueError, "not supported on sparse networks"):
+            net.propagate(method="sweep")
+        with self.assertRaisesRegex(ValueError, "Unknown propagation method"):
+            net.propagate(method="no such method")
+
+    def test_ppc_propagation_examples(self):
+        for file_name in self.example_networks():
+            for sparse in (False, True):
+                with self.subTest(network=file_name, sparse=sparse):
+                    full = self.load_network(file_name)
+                    partial = qr.Network(algebra_path=self.alg_path, sparse=sparse,
+                                         json_file_name=os.path.join(self.net_path, file_name))
+                    consistent = full.propagate()
+                    self.assertEqual(consistent, partial.propagate(method="ppc"))
+                    if consistent:
+                        # Partial path consistency never tightens a constraint beyond full path consistency
+                        for tail, head, cons in full.edges(data='constraint'):
+                            partial_cons = partial.get_constraint(tail.name, head.name)
+                            self.assertEqual(cons + partial.algebra.string_to_relset(partial_cons), cons)
+
+    def test_chordal_completion(self):
+        net = self.book_example(self.alg0, ["ProperInterval"])
+        chordal, fill_edges = net.chordal_completion()
+        self.assertTrue(nx.is_chordal(chordal))
+        self.assertEqual(chordal.number_of_edges(), 6 + len(fill_edges))
+        graph = nx.cycle_graph(6)
+        chordal, order, fill_edges = qr.min_fill_in_triangulation(graph)
+        self.assertTrue(nx.is_chordal(chordal))
+        self.assertEqual(len(fill_edges), 3)
+        self.assertEqual(sorted(order), list(range(6)))
+
+    def test_consistent_singleton_labelings(self):
+        net = self.load_network('BookExample.json')
+        exhaustive = [labeling.to_list() for labeling in net.all_singleton_labelings() if labeling.propagate()]
+        searched = [labeling.to_list() for labeling in net.consistent_singleton_labelings()]
+        self.assertEqual(len(searched), len(exhaustive))
+        self.assertCountEqual(searched, exhaustive)
+        # The example in the README
+        rcc8_net = self.load_network('rcc8_example.json')
+        rcc8_net.propagate()
+        labelings = rcc8_net.consistent_singleton_labelings()
+        self.assertEqual(len(labelings), 9)
+        self.assertTrue(all(labeling.has_only_singleton_constraints() for labeling in labelings))
+
+    def test_iter_singleton_labelings(self):
+        # The example in the README, which used to exceed the recursion limit when run here
+        rcc8_net = self.load_network('rcc8_example.json')
+        rcc8_net.propagate()
+        self.assertEqual(sum(1 for _ in rcc8_net.iter_singleton_labelings()), 32)
+        self.assertEqual(len(rcc8_net.all_singleton_labelings()), 32)
+        self.assertEqual(len(list(rcc8_net.iter_singleton_labelings(limit=5))), 5)
+        x = qr.TemporalEntity(["ProperInterval"], "X")
+        y = qr.TemporalEntity(["ProperInterval"], "Y")
+        z = qr.TemporalEntity(["ProperInterval"], "Z")
+        net = qr.Network(self.alg0, "Order")
+        net.add_constraint(x, y, "B|M")
+        net.add_constraint(y, z, "B|M")
+        self.assertEqual([(labeling.get_constraint("X", "Y"), labeling.get_constraint("Y", "Z"))
+                          for labeling in net.iter_singleton_labelings()],
+                         [("M", "M"), ("M", "B"), ("B", "M"), ("B", "B")])
+        first_two = [labeling.to_list() for labeling in rcc8_net.iter_consistent_singleton_labelings(limit=2)]
+        self.assertEqual(first_two,
+                         [labeling.to_list() for labeling in rcc8_net.consistent_singleton_labelings()[:2]])
+
+    def test_checkpoint_rollback(self):
+        net = self.load_network('rcc8_example.json')
+        original = net.to_list()
+        self.assertEqual(net.checkpoint(), 1)
+        self.assertTrue(net.propagate())
+        propagated = net.to_list()
+        self.assertEqual(net.checkpoint(), 2)
+        park = qr.SpatialEntity(["Region"], "Park")
+        self.assertTrue(net.assert_constraint(net.get_entity("House1"), park, "DC"))
+        net.remove_node(net.get_entity("Road"))
+        net.rollback()
+        self.assertEqual(net.to_list(), propagated)
+        self.assertIsNone(net.get_entity("Park"))
+        self.assertIsNotNone(net.get_entity("Road"))
+        net.rollback()
+        self.assertEqual(net.to_list(), original)
+        with self.assertRaises(ValueError):
+            net.rollback()
+        # Committed changes are kept
+        net.checkpoint()
+        net.propagate()
+        net.commit()
+        self.assertEqual(net.to_list(), propagated)
+        with self.assertRaises(ValueError):
+            net.commit()
+        # Edges removed in bulk are restored
+        edges = sorted((tail.name, head.name, str(cons)) for tail, head, cons in net.edges(data='constraint'))
+        net.checkpoint()
+        net.remove_edges_from(list(net.edges)[:5])
+        self.assertEqual(net.number_of_edges(), len(edges) - 5)
+        net.clear_edges()
+        self.assertEqual(net.number_of_edges(), 0)
+        net.rollback()
+        self.assertEqual(sorted((tail.name, head.name, str(cons)) for tail, head, cons in net.edges(data='constraint')),
+                         edges)
+        # Entity classes narrowed by propagation are restored too
+        x = qr.TemporalEntity(["Point", "ProperInterval"], "X")
+        y = qr.TemporalEntity(["Point", "ProperInterval"], "Y")
+        net = qr.Network(self.alg1, "Extended")
+        net.add_constraint(x, y, "B|PE")
+        self.assertTrue(net.propagate())
+        classes = [sorted(x.classes), sorted(y.classes)]
+        self.assertEqual(classes, [["Point", "ProperInterval"]] * 2)
+        net.checkpoint()
+        self.assertTrue(net.assert_constraint(x, y, "PE"))
+        self.assertTrue(net.propagate())
+        self.assertEqual([x.classes, y.classes], [["Point"]] * 2)
+        net.rollback()
+        self.assertEqual([sorted(x.classes), sorted(y.classes)], classes)
+
+    def test_clone(self):
+        for sparse in (False, True):
+            with self.subTest(sparse=sparse):
+                net = qr.Network(algebra_path=self.alg_path, sparse=sparse,
+                                 json_file_name=os.path.join(self.net_path, 'rcc8_example.json'))
+                net.propagate()
+                net_clone = net.clone()
+                self.assertEqual(net_clone.to_list(), net.to_list())
+                self.assertEqual(net_clone.sparse, sparse)
+                self.assertIs(net_clone.algebra, net.algebra)
+                for entity, entity_clone in zip(net.nodes, net_clone.nodes):
+                    self.assertIsNot(entity_clone, entity)
+                    self.assertEqual(entity_clone.name, entity.name)
+                    self.assertIs(net_clone.get_entity(entity.name), entity_clone)
+                # Changing the clone doesn't change the original
+                original = net.to_list()
+                self.assertTrue(net_clone.assert_constraint(net_clone.get_entity("House1"),
+                                                            net_clone.get_entity("Property1"), "TPP"))
+                self.assertNotEqual(net_clone.to_list(), original)
+                self.assertEqual(net.to_list(), original)
+
+    def test_algebra_registry(self):
+        nets = [self.load_network(file_name) for file_name in self.example_networks()]
+        # Networks that name the same algebra share a single instance of it
+        self.assertIs(nets[0].algebra, nets[-2].algebra)
+        self.assertIs(nets[0].algebra, qr.algebra_registry.get('Linear_Interval_Algebra', self.alg_path))
+        self.assertIsNot(nets[0].algebra, nets[-1].algebra)
+        registry = qr.AlgebraRegistry([self.alg_path])
+        rcc8 = registry.get('RCC8_Algebra')
+        self.assertIs(registry.get(os.path.join(self.alg_path, 'RCC8_Algebra.json')), rcc8)
+        self.assertIs(registry.intern(self.alg4.algebra_dict), rcc8)
+        self.assertEqual(len(registry), 1)
+        with self.assertRaises(ValueError):
+            registry.get('No_Such_Algebra')
+        # The tables of a shared algebra can't be changed
+        with self.assertRaises(ValueError):
+            rcc8.composition_matrix[0, 0] = 0
+        with self.assertRaises(ValueError):
+            rcc8.full_composition_table[0, 0] = 0
+
+    def point_chain(self, constraints, sparse=False):
+        algebra = qr.algebra_registry.get('Linear_Point_Algebra', self.alg_path)
+        points = [qr.TemporalEntity(["Point"], f"P{i}") for i in range(len(constraints) + 1)]
+        net = qr.Network(algebra, "Point Chain", sparse=sparse)
+        for i, constraint in enumerate(constraints):
+            net.add_constraint(points[i], points[i + 1], constraint)
+        return net, points
+
+    def test_point_network_solver(self):
+        constraints = ["<", "<|=", "=", "<|=", "<", "=|>", "<|=|>", "<"]
+        for sparse in (False, True):
+            with self.subTest(sparse=sparse):
+                self.assertEqual(self.point_chain([])[0].algebra.linear_point_relations, ("<", "=", ">"))
+                net_points, points = self.point_chain(constraints, sparse)
+                net_queue, _ = self.point_chain(constraints, sparse)
+                solver = qr.PointNetworkSolver(net_points)
+                self.assertTrue(solver.consistent)
+                self.assertEqual(str(solver.relation(points[0], points[4])), "<")
+                self.assertEqual(str(solver.relation(points[1], points[4])), "<|=")
+                self.assertEqual(str(solver.relation(points[2], points[3])), "=")
+                self.assertEqual(str(solver.relation(points[5], points[8])), "<|=|>")
+                solution = solver.solution()
+                self.assertLess(solution[points[0]], solution[points[1]])
+                self.assertEqual(solution[points[2]], solution[points[3]])
+                self.assertTrue(net_points.propagate())
+                self.assertTrue(net_queue.propagate(method="queue"))
+                self.assertEqual(net_points.to_list(), net_queue.to_list())
+                # A cycle through '<' is inconsistent
+                self.assertFalse(net_points.assert_constraint(points[4], points[0], "<|="))
+        net, points = self.point_chain(["<|>", "="])
+        solver = qr.PointNetworkSolver(net)
+        self.assertFalse(qr.PointNetworkSolver.is_convex(net))
+        self.assertTrue(solver.consistent)
+        with self.assertRaises(ValueError):
+            solver.relation(points[0], points[2])
+        net.add_constraint(points[0], points[2], "=")
+        self.assertFalse(qr.PointNetworkSolver(net).consistent)
+        self.assertFalse(net.propagate())
+        with self.assertRaises(ValueError):
+            qr.PointNetworkSolver(self.book_example(self.alg0, ["ProperInterval"]))
+
+    def test_interval_point_reducer(self):
+        ents = {name: qr.TemporalEntity(["ProperInterval"], name) for name in "IJKL"}
+        constraints = [("I", "J", "B|M"), ("J", "K", "O|S|D"), ("K", "L", "S|E|SI"), ("I", "L", "B|M|O|S|E|SI|FI|DI")]
+        for sparse in (False, True):
+            with self.subTest(sparse=sparse):
+                net_points = qr.Network(self.alg0, "Pointisable", sparse=sparse)
+                net_queue = qr.Network(self.alg0, "Pointisable", sparse=sparse)
+                for tail, head, constraint in constraints:
+                    net_points.add_constraint(ents[tail], ents[head], constraint)
+                    net_queue.add_constraint(ents[tail], ents[head], constraint)
+                reducer = qr.IntervalPointReducer(net_points)
+                self.assertTrue(reducer.reducible)
+                self.assertTrue(reducer.solver.consistent)
+                self.assertEqual(str(self.alg0.elements_bitset.fromint(reducer.relation_mask(ents["I"], ents["K"]))),
+                                 "B|M|O|S")
+                self.assertTrue(net_points.propagate(method="points"))
+                self.assertTrue(net_queue.propagate(method="queue"))
+                self.assertEqual(net_points.to_list(), net_queue.to_list())
+        # 'B|BI' isn't convex, so the network is left to the general engine
+        self.assertFalse(qr.IntervalPointReducer.is_reducible(self.book_example(self.alg0, ["ProperInterval"])))
+        net = self.book_example(self.alg0, ["ProperInterval"])
+        net.add_constraint(net.get_entity("I"), net.get_entity("J"), "B|BI")
+        self.assertFalse(qr.IntervalPointReducer.is_reducible(net))
+        with self.assertRaises(ValueError):
+            net.propagate(method="points")
+        with self.assertRaises(ValueError):
+            qr.IntervalPointReducer(self.load_network('rcc8_example.json'))
+
+    def test_interval_point_reducer_checks_compositions(self):
+        # Allen's algebra with the names of B & M (and BI & MI) swapped isn't reduced
+        swap = {"B": "M", "M": "B", "BI": "MI", "MI": "BI"}
+
+        def rename(relset):
+            return "|".join(swap.get(rel, rel) for rel in relset.split("|")) if relset else relset
+        alg_dict = self.alg0.algebra_dict
+        swapped = qr.Algebra(alg_dict=dict(
+            alg_dict, Name="Swapped",
+            Relations={swap.get(rel, rel): dict(info, Converse=swap.get(info["Converse"], info["Converse"]))
+                       for rel, info in alg_dict["Relations"].items()},
+            TransTable={swap.get(rel1, rel1): {swap.get(rel2, rel2): rename(comp) for rel2, comp in row.items()}
+                        for rel1, row in alg_dict["TransTable"].items()}))
+        self.assertIsNotNone(qr.IntervalPointReducer.point_signatures(self.alg0))
+        self.assertIsNone(qr.IntervalPointReducer.point_signatures(swapped))
+        ents = {name: qr.TemporalEntity(["ProperInterval"], name) for name in "IJK"}
+        net = qr.Network(swapped, "Swapped")
+        net.add_constraint(ents["I"], ents["J"], "B")
+        net.add_constraint(ents["J"], ents["K"], "B")
+        self.assertFalse(qr.IntervalPointReducer.is_reducible(net))
+        self.assertTrue(net.propagate())
+        # In this algebra, B means meets, so I is before K
+        self.assertEqual(net.get_constraint("I", "K"), "M")
+
+    def test_interval_point_reducer_created_once(self):
+        ents = {name: qr.TemporalEntity(["ProperInterval"], name) for name in "IJK"}
+        net = qr.Network(self.alg0, "Pointisable")
+        net.add_constraint(ents["I"], ents["J"], "B|M")
+        net.add_constraint(ents["J"], ents["K"], "O|S|D")
+        self.assertTrue(qr.IntervalPointReducer.is_reducible(net))
+        reducers = []
+        init = qr.IntervalPointReducer.__init__
+
+        def counting_init(reducer, *args, **kwargs):
+            reducers.append(reducer)
+            init(reducer, *args, **kwargs)
+        with mock.patch.object(qr.IntervalPointReducer, "__init__", counting_init):
+            net.propagate()
+        self.assertEqual(len(reducers), 1)
+
+    def test_interval_point_reducer_without_algebras_path(self):
+        # The point algebra doesn't depend on finding Linear_Point_Algebra.json
+        ents = {name: qr.TemporalEntity(["ProperInterval"], name) for name in "IJK"}
+        net_default = qr.Network(self.alg0, "Pointisable")
+        net_queue = qr.Network(self.alg0, "Pointisable")
+        for net in (net_default, net_queue):
+            net.add_constraint(ents["I"], ents["J"], "B|M")
+            net.add_constraint(ents["J"], ents["K"], "O|S|D")
+        with mock.patch.object(qr, "algebra_registry", qr.AlgebraRegistry(algebra_paths=())):
+            with self.assertRaises(ValueError):
+                qr.algebra_registry.get("Linear_Point_Algebra")
+            self.assertTrue(qr.IntervalPointReducer.is_reducible(net_default))
+            self.assertTrue(net_default.propagate())
+        self.assertTrue(net_queue.propagate(method="queue"))
+        self.assertEqual(net_default.to_list(), net_queue.to_list())
+
+    def test_constraint_components(self):
+        # Three copies of the RCC8 example, with no constraints between them
+        example = self.load_network('rcc8_example.json').to_dict()
+        net_dict = dict(example, nodes=[], edges=[])
+        for copy in range(3):
+            net_dict["nodes"] += [[f"{name}{copy}", classes] for name, classes in example["nodes"]]
+            net_dict["edges"] += [[f"{tail}{copy}", f"{head}{copy}", constraint]
+                                  for tail, head, constraint in example["edges"]]
+        algebra = self.load_network('rcc8_example.json').algebra
+        for sparse in (False, True):
+            for workers in (None, 2):
+                with self.subTest(sparse=sparse, workers=workers):
+                    net = qr.Network(algebra=algebra, network_dict=net_dict, sparse=sparse)
+                    components = net.constraint_components()
+                    self.assertEqual([len(component) for component in components], [5, 5, 5])
+                    self.assertEqual([entity.name for entity in components[0]],
+                                     [f"{name}0" for name, _ in example["nodes"]])
+                    cmat = qr.Network(algebra=algebra, network_dict=net_dict, sparse=sparse).to_matrix()
+                    self.assertTrue(net.propagate(workers=workers))
+                    self.assertTrue(cmat.propagate())
+                    self.assertEqual(net.to_list(), cmat.to_list())
+                    self.assertEqual(net.get_edge("House11", "Road0")[2], str(algebra.elements))
+        # An inconsistent component makes the whole network inconsistent
+        net_dict["edges"].append(["House10", "House11", "DC"])
+        net_dict["edges"].append(["House11", "House12", "EQ"])
+        net_dict["edges"].append(["House10", "House12", "EQ"])
+        self.assertFalse(qr.Network(algebra=algebra, network_dict=net_dict).propagate())
+
+    def test_unknown_method(self):
+        net = self.book_example(self.alg0, ["ProperInterval"])
+        with self.assertRaises(ValueError):
+            net.propagate(method="no-such-method")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,13 +6,26 @@
 # BITSETS: https://bitsets.readthedocs.io/en/stable/
 from bitsets import bitset, bases
 import os
+import copy
 import json
 import random
 import string
+import hashlib
+import warnings
+try:
+    import fcntl
+except ImportError:  # e.g., on Windows, where the derived algebra cache works without locking
+    fcntl = None
 # NETWORKX: https://networkx.github.io/
 import networkx as nx
 from functools import reduce
-from collections import abc, OrderedDict
+from itertools import islice, product
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+import heapq
+import threading
+import weakref
+from collections import abc, OrderedDict, deque
 import numpy as np
 
 __author__ = 'Alfred J. Reich'
@@ -32,6 +45,86 @@ def flatten(lst):
     return reduce(lambda x, y: x + y, lst)
 
 
+def mask_dtype(num_elements):
+    """Return the smallest unsigned NumPy integer type that can hold a relation set,
+    over an algebra with num_elements relations, as a bit mask.  Beyond 64 relations,
+    the bit masks are kept as Python ints, in arrays of type object, which works the same
+    way, only more slowly."""
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if num_elements <= np.iinfo(dtype).bits:
+            return dtype
+    return object
+
+
+# Relation sets are composed a chunk of bits at a time (see Algebra.compose_masks) using
+# tables that hold the composition of every pair of subsets of two chunks of relations.
+CHUNK_BITS = 8
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# The file, in a compiled algebra directory (see Algebra.compile), that holds everything but
+# the algebra's tables.
+COMPILED_ALGEBRA_HEADER = "algebra.json"
+
+# Change this whenever a change to the tables, or how they're laid out, means that the tables
+# saved by an earlier version of Algebra.compile can't be used.  (The directories also record
+# CHUNK_BITS, which they're only valid for.)
+COMPILED_ALGEBRA_VERSION = 1
+
+# Algebras with at most this many relations get a single table holding the composition of
+# every pair of relation sets, i.e., 2^n x 2^n entries (65,536 for the 8 relations of RCC8).
+FULL_TABLE_MAX_ELEMENTS = 8
+
+
+def union_table(single, rows, cols):
+    """Given an array, single, where single[i, j] is the bit mask for the composition of
+    the i-th and j-th relations, return an array, T, where T[a, b] is the union of
+    single[i, j] over every i in a and every j in b.  Here, a and b are bit masks over the
+    relation indices listed in rows and cols, resp."""
+    rows = list(rows)
+    cols = list(cols)
+    # partial[a, j] is the union of single[i, cols[j]] over every i in a
+    partial = np.zeros((1 << len(rows), len(cols)), dtype=single.dtype)
+    for a in range(1, 1 << len(rows)):
+        low = a & -a
+        partial[a] = partial[a ^ low] | single[rows[low.bit_length() - 1], cols]
+    # Built transposed, so that each step below writes a contiguous row
+    table_t = np.zeros((1 << len(cols), 1 << len(rows)), dtype=single.dtype)
+    for b in range(1, 1 << len(cols)):
+        low = b & -b
+        table_t[b] = table_t[b ^ low] | partial[:, low.bit_length() - 1]
+    return np.ascontiguousarray(table_t.T)
+
+
+def union_vector(single, indices):
+    """Given an array, single, of bit masks, return an array, V, where V[a] is the union of
+    single[i] over every i in a.  Here, a is a bit mask over the indices listed in indices."""
+    indices = list(indices)
+    vector = np.zeros(1 << len(indices), dtype=single.dtype)
+    for a in range(1, 1 << len(indices)):
+        low = a & -a
+        vector[a] = vector[a ^ low] | single[indices[low.bit_length() - 1]]
+    return vector
+
+
+def chunk_index(bits):
+    """Return an array of chunks of bit masks (see CHUNK_BITS) as one that can index a table.
+    Only the bit masks of algebras with more than 64 relations, which are Python ints in
+    arrays of type object (see mask_dtype), need converting."""
+    return bits.astype(np.intp) if bits.dtype == object else bits
+
+
+def table_rows(table):
+    """Return a 2-D array as a list of tuples of Python ints, for fast scalar lookups.
+    Equal values share one int object, which keeps large tables small."""
+    if table.dtype == object:
+        # The values are already Python ints, and np.unique is slow at sorting them
+        values = dict()
+        return [tuple(values.setdefault(value, value) for value in row) for row in table.tolist()]
+    values, inverse = np.unique(table, return_inverse=True)
+    values = values.tolist()
+    return [itemgetter(*row)(values) for row in inverse.reshape(table.shape).tolist()]
+
+
 # The fundamental algebraic elements here are SETS of relations, not individual relations.
 # An individual relation, r, relates two temporal entities (te), e.g, teA r teB.  Sets
 # of relations denote disjunctions, e.g., teA {r,s} teB <==> (teA r teB) or (teA s teB).
@@ -147,12 +240,26 @@ def abbrev(term_list):
 class Algebra:
     """An object that represents a Relation Algebra"""
 
-    def __init__(self, filename=None, alg_dict=None):
+    def __init__(self, filename=None, alg_dict=None, full_table_max_elements=FULL_TABLE_MAX_ELEMENTS,
+                 compiled_path=None):
         """An algebra is created from a JSON file containing the algebra's
         relation and transitivity table definitions.  An algebra can also
-        be instantiated from a dictionary.
+        be instantiated from a dictionary.  If the algebra has no more than
+        full_table_max_elements relations, then the composition of every pair
+        of relation sets is precomputed (see composition_table_nbytes).
+        An algebra can also be loaded from a compiled algebra directory,
+        compiled_path (see compile), in which case its tables are memory-mapped
+        rather than computed, and full_table_max_elements is ignored.
         """
-        if filename:
+        if compiled_path:
+            with open(os.path.join(compiled_path, COMPILED_ALGEBRA_HEADER), 'r') as f:
+                header = json.load(f)
+            if (header.get("Version"), header.get("ChunkBits")) != (COMPILED_ALGEBRA_VERSION, CHUNK_BITS):
+                raise ValueError(f"{compiled_path} was compiled with version {header.get('Version')} and "
+                                 f"CHUNK_BITS = {header.get('ChunkBits')}, but version {COMPILED_ALGEBRA_VERSION} "
+                                 f"and CHUNK_BITS = {CHUNK_BITS} are required; compile it again")
+            self.algebra_dict = header["Algebra"]
+        elif filename:
             with open(filename, 'r') as f:
                 self.algebra_dict = json.load(f)
         else:
@@ -174,6 +281,10 @@ class Algebra:
 
         self.elements = self.elements_bitset.supremum
 
+        # A RelSet is also an int, where bit i is set if the i-th element is in the set.
+        # This is the NumPy type used to store such bit masks (e.g., in a ConstraintMatrix).
+        self.mask_dtype = mask_dtype(len(self.elements))
+
         # The equality relations of the algebra
         self.__equality_relations = self.relset([rel for rel in self.elements if self.rel_equality(rel)])
 
@@ -183,13 +294,65 @@ class Algebra:
             dom = self.rel_domain(eqrel)[0]  # Get the single item out of the eqrel's domain set.
             self.equality_relations_dict[dom] = self.relset([eqrel])
 
-        # Setup the transitivity (or composition) table to be used by Relation Set composition.
-        # This code can read both the original transitivity table format and the newer compact
-        # transitivity table format, which is now the default.
-        self.transitivity_table = dict()
+        # The copies of the composition tables that compose_masks uses are created on first use
+        self.__full_composition_rows = None
+        self.__composition_rows = None
+
+        if compiled_path:
+            # The transitivity table is created from the composition tables on first use
+            self.__transitivity_table = None
+            self.__load_compiled_tables(compiled_path, header)
+        else:
+            self.__setup_transitivity_table()
+            # Setup the tables used to compose and convert relation sets in their integer (bit mask) form.
+            self.__setup_composition_tables(full_table_max_elements)
+            self.__setup_converse_tables()
+            # Like the memory-mapped tables of a compiled algebra, the tables are read-only, since
+            # an algebra may be shared by many networks (see AlgebraRegistry).
+            for table in self.__table_arrays():
+                table.flags.writeable = False
+
+        # True if composing the universal relation set with any non-empty relation set, on
+        # either side, yields the universal relation set (see Network.assert_constraint).
+        # Composition distributes over union, so it's enough to check the singletons.
+        # (compose_many is used so that the scalar tables needn't be created yet.)
+        universal = int(self.elements)
+        singletons = np.array([1 << i for i in range(len(self.elements))], dtype=self.mask_dtype)
+        universals = np.full_like(singletons, universal)
+        self.universal_is_absorbing = bool(np.all(self.compose_many(universals, singletons) == universal) and
+                                           np.all(self.compose_many(singletons, universals) == universal))
+
+        # The names of the (less-than, equals, greater-than) relations, if this is a linear point
+        # algebra, or None (see PointNetworkSolver).
+        self.linear_point_relations = self.__find_linear_point_relations()
+
+    def __find_linear_point_relations(self):
+        """If the algebra's relations compose like <, =, and > on a line, return their names,
+        in that order, otherwise return None."""
+        equals = [rel for rel in self.elements if self.rel_equality(rel)]
+        if len(self.elements) != 3 or len(equals) != 1:
+            return None
+        less, greater = [rel for rel in self.elements if rel != equals[0]]
+        if self.converse(less) != greater:
+            return None
+        masks = {rel: int(self.relset(rel)) for rel in self.elements}
+        universal = int(self.elements)
+        expected = {(less, less): masks[less], (greater, greater): masks[greater],
+                    (less, greater): universal, (greater, less): universal}
+        for rel in self.elements:
+            expected[(equals[0], rel)] = expected[(rel, equals[0])] = masks[rel]
+        if all(self.compose_masks(masks[rel1], masks[rel2]) == mask for (rel1, rel2), mask in expected.items()):
+            return less, equals[0], greater
+        return None
+
+    def __setup_transitivity_table(self):
+        """Setup the transitivity (or composition) table to be used by Relation Set composition.
+        This code can read both the original transitivity table format and the newer compact
+        transitivity table format, which is now the default."""
+        self.__transitivity_table = dict()
         tabledefs = self.algebra_dict["TransTable"]
         for rel1 in tabledefs:
-            self.transitivity_table[rel1] = dict()
+            self.__transitivity_table[rel1] = dict()
             for rel2 in tabledefs[rel1]:
                 table_entry = tabledefs[rel1][rel2]
                 if type(table_entry) == list:
@@ -202,7 +365,144 @@ class Algebra:
                 else:
                     raise Exception("Bad entry in transitivity table")
                 # print(rel1, rel2)
-                self.transitivity_table[rel1][rel2] = self.elements_bitset(tuple(entry))
+                self.__transitivity_table[rel1][rel2] = self.elements_bitset(tuple(entry))
+
+    @property
+    def transitivity_table(self):
+        """A dictionary of dictionaries, where transitivity_table[rel1][rel2] is the relation
+        set (RelSet) that's the composition of the relations, rel1 and rel2."""
+        if self.__transitivity_table is None:
+            rel_index = {rel: i for i, rel in enumerate(self.elements)}
+            fromint = self.elements_bitset.fromint
+            tabledefs = self.algebra_dict["TransTable"]
+            self.__transitivity_table = {
+                rel1: {rel2: fromint(int(self.composition_matrix[rel_index[rel1], rel_index[rel2]]))
+                       for rel2 in tabledefs[rel1]}
+                for rel1 in tabledefs}
+        return self.__transitivity_table
+
+    def __setup_composition_tables(self, full_table_max_elements):
+        """Small algebras get one table, full_composition_table, that holds the composition
+        of every pair of relation sets, so composition is a single lookup.  Otherwise, the
+        relations are split into chunks of CHUNK_BITS relations, and for every pair of chunks
+        a table is created that holds the compositions of every subset of the first chunk with
+        every subset of the second chunk.  Composing two relation sets then takes one table
+        lookup per pair of non-empty chunks (see compose_masks)."""
+        rels = list(self.elements)
+        num_rels = len(rels)
+        # composition_matrix[i, j] is the bit mask of the composition of relations i and j
+        self.composition_matrix = np.zeros((num_rels, num_rels), dtype=self.mask_dtype)
+        for i, rel1 in enumerate(rels):
+            for j, rel2 in enumerate(rels):
+                self.composition_matrix[i, j] = int(self.transitivity_table[rel1][rel2])
+        if num_rels <= full_table_max_elements:
+            self.full_composition_table = union_table(self.composition_matrix, range(num_rels), range(num_rels))
+            self.composition_chunks = None
+        else:
+            chunks = [range(start, min(start + CHUNK_BITS, num_rels))
+                      for start in range(0, num_rels, CHUNK_BITS)]
+            self.full_composition_table = None
+            self.composition_chunks = [[union_table(self.composition_matrix, rows, cols) for cols in chunks]
+                                       for rows in chunks]
+
+    def __setup_composition_rows(self):
+        """Create the copies of the composition tables, as tuples of Python ints, used for
+        scalar lookups by compose_masks.  Since that takes much longer than loading a compiled
+        algebra, it's put off until the first scalar composition."""
+        if self.full_composition_table is not None:
+            self.__full_composition_rows = table_rows(self.full_composition_table)
+        else:
+            self.__composition_rows = [[table_rows(table) for table in chunk_row]
+                                       for chunk_row in self.composition_chunks]
+
+    def __setup_converse_tables(self):
+        """For every chunk of CHUNK_BITS relations, create a table that maps each subset of the
+        chunk to the bit mask of its converse (see converse_mask)."""
+        rels = list(self.elements)
+        rel_index = {rel: i for i, rel in enumerate(rels)}
+        # converse_vector[i] is the bit mask of the converse of relation i
+        self.converse_vector = np.array([1 << rel_index[self.rel_info_dict[rel]["Converse"]] for rel in rels],
+                                        dtype=self.mask_dtype)
+        self.converse_chunks = [union_vector(self.converse_vector, range(start, min(start + CHUNK_BITS, len(rels))))
+                                for start in range(0, len(rels), CHUNK_BITS)]
+        self.__converse_rows = [table.tolist() for table in self.converse_chunks]
+
+    def compile(self, compiled_path):
+        """Save the algebra, with its composition and converse tables, as a compiled algebra
+        directory that Algebra(compiled_path=...) loads without recomputing any tables.  The
+        tables are saved as NumPy .npy files, so that they can be memory-mapped, and shared
+        by the processes that load them, and the rest of the algebra as a JSON file, along
+        with the version of this format and CHUNK_BITS, which loading it checks."""
+        if self.mask_dtype == object:
+            raise ValueError(f"{self.name} has more than 64 relations, so its tables can't be memory-mapped")
+        os.makedirs(compiled_path, exist_ok=True)
+        arrays = {"composition_matrix": self.composition_matrix, "converse_vector": self.converse_vector}
+        if self.full_composition_table is not None:
+            arrays["full_composition_table"] = self.full_composition_table
+        else:
+            for i, chunk_row in enumerate(self.composition_chunks):
+                for j, table in enumerate(chunk_row):
+                    arrays[f"composition_chunk_{i}_{j}"] = table
+        for i, table in enumerate(self.converse_chunks):
+            arrays[f"converse_chunk_{i}"] = table
+        for array_name, array in arrays.items():
+            np.save(os.path.join(compiled_path, array_name + ".npy"), array)
+        # The header is written last, since an algebra can't be loaded without it
+        header = {"Version": COMPILED_ALGEBRA_VERSION,
+                  "ChunkBits": CHUNK_BITS,
+                  "Algebra": self.algebra_dict,
+                  "FullTable": self.full_composition_table is not None,
+                  "NumChunks": len(self.converse_chunks)}
+        with open(os.path.join(compiled_path, COMPILED_ALGEBRA_HEADER), "w") as out:
+            json.dump(header, out, indent=4, separators=(',', ':'))
+
+    def __load_compiled_tables(self, compiled_path, header):
+        """Memory-map the composition and converse tables saved by compile."""
+        def load(array_name):
+            return np.asarray(np.load(os.path.join(compiled_path, array_name + ".npy"), mmap_mode='r'))
+
+        num_chunks = header["NumChunks"]
+        self.composition_matrix = load("composition_matrix")
+        if header["FullTable"]:
+            self.full_composition_table = load("full_composition_table")
+            self.composition_chunks = None
+        else:
+            self.full_composition_table = None
+            self.composition_chunks = [[load(f"composition_chunk_{i}_{j}") for j in range(num_chunks)]
+                                       for i in range(num_chunks)]
+        self.converse_vector = load("converse_vector")
+        self.converse_chunks = [load(f"converse_chunk_{i}") for i in range(num_chunks)]
+        self.__converse_rows = [table.tolist() for table in self.converse_chunks]
+
+    def __table_arrays(self):
+        """Generate the composition and converse tables' arrays."""
+        yield self.composition_matrix
+        if self.full_composition_table is not None:
+            yield self.full_composition_table
+        else:
+            for chunk_row in self.composition_chunks:
+                yield from chunk_row
+        yield self.converse_vector
+        yield from self.converse_chunks
+
+    @property
+    def composition_table_nbytes(self):
+        """The number of bytes used by the composition tables' arrays.  (The scalar lookups in
+        compose_masks use a copy of each table, as tuples, that adds at least 8 bytes/entry.)"""
+        if self.full_composition_table is not None:
+            return self.composition_matrix.nbytes + self.full_composition_table.nbytes
+        return self.composition_matrix.nbytes + sum(table.nbytes for chunk_row in self.composition_chunks
+                                                    for table in chunk_row)
+
+    def universal_edges_to_requeue(self, entity, others):
+        """Return the edges, between entity and each of the others, that must be (re)propagated
+        after being given the universal constraint.  A universal edge is only inert, wrt the
+        triangles that it's in, if U;X = X;U = U (see universal_is_absorbing), in which case
+        none are returned."""
+        if self.universal_is_absorbing:
+            return []
+        return [edge for other in others if other != entity
+                for edge in ((entity, other), (other, entity))]
 
     # TODO: Write a to_dict() method for Algebras
 
@@ -241,7 +541,18 @@ class Algebra:
         if isinstance(rel_or_relset, str):
             return self.rel_info_dict[rel_or_relset]["Converse"]
         else:
-            return self.elements_bitset((self.converse(r) for r in rel_or_relset.members()))
+            return self.elements_bitset.fromint(self.converse_mask(int(rel_or_relset)))
+
+    def converse_mask(self, mask):
+        """Return the converse of a relation set given, and returned, as an int bit mask."""
+        tables = self.__converse_rows
+        result = 0
+        chunk = 0
+        while mask:
+            result |= tables[chunk][mask & CHUNK_MASK]
+            mask >>= CHUNK_BITS
+            chunk += 1
+        return result
 
     def __str__(self):
         """Return a string representation of the Algebra."""
@@ -276,14 +587,64 @@ class Algebra:
         """Composition is done, element-by-element, on the cross-product
         of the two sets using the algebra's transitivity table, and
         then reducing those results to a single relation set using set
-        union.
+        union.  The work is done on the sets' bit masks by compose_masks.
         """
-        result = self.elements_bitset.infimum  # the empty relation set
-        for r1 in relset1:
-            for r2 in relset2:
-                result = result.union(self.transitivity_table[r1][r2])
+        return self.elements_bitset.fromint(self.compose_masks(int(relset1), int(relset2)))
+
+    def compose_masks(self, mask1, mask2):
+        """Return the composition of two relation sets given, and returned, as int bit masks."""
+        if self.__full_composition_rows is not None:
+            return self.__full_composition_rows[mask1][mask2]
+        tables = self.__composition_rows
+        if tables is None:
+            self.__setup_composition_rows()
+            return self.compose_masks(mask1, mask2)
+        result = 0
+        chunk1 = 0
+        while mask1:
+            bits1 = mask1 & CHUNK_MASK
+            if bits1:
+                chunk_tables = tables[chunk1]
+                rest2 = mask2
+                chunk2 = 0
+                while rest2:
+                    bits2 = rest2 & CHUNK_MASK
+                    if bits2:
+                        result |= chunk_tables[chunk2][bits1][bits2]
+                    rest2 >>= CHUNK_BITS
+                    chunk2 += 1
+            mask1 >>= CHUNK_BITS
+            chunk1 += 1
+        return result
+
+    def compose_many(self, masks1, masks2):
+        """Compose two arrays of relation set bit masks, element by element (the arrays are
+        broadcast against each other).  Return an array of bit masks of type mask_dtype, with
+        results identical to those of compose_masks."""
+        masks1, masks2 = np.broadcast_arrays(np.asarray(masks1), np.asarray(masks2))
+        if self.full_composition_table is not None:
+            return self.full_composition_table[masks1, masks2]
+        result = np.zeros(masks1.shape, dtype=self.mask_dtype)
+        chunk_bits2 = [chunk_index((masks2 >> (chunk2 * CHUNK_BITS)) & CHUNK_MASK)
+                       for chunk2 in range(len(self.composition_chunks))]
+        for chunk1, chunk_tables in enumerate(self.composition_chunks):
+            bits1 = chunk_index((masks1 >> (chunk1 * CHUNK_BITS)) & CHUNK_MASK)
+            for table, bits2 in zip(chunk_tables, chunk_bits2):
+                result |= table[bits1, bits2]
         return result
 
+    def converse_many(self, masks):
+        """Return an array of the converses of an array of relation set bit masks."""
+        masks = np.asarray(masks)
+        result = np.zeros(masks.shape, dtype=self.mask_dtype)
+        for chunk, table in enumerate(self.converse_chunks):
+            result |= table[chunk_index((masks >> (chunk * CHUNK_BITS)) & CHUNK_MASK)]
+        return result
+
+    def intersect_many(self, masks1, masks2):
+        """Intersect (i.e., 'add', see RelSet) two arrays of relation set bit masks, element by element."""
+        return np.bitwise_and(masks1, masks2).astype(self.mask_dtype, copy=False)
+
     def get_domain_classes(self, relset):
         """Returns the set of domain classes supported by the relations in a relset."""
         return set(flatten(list(map(lambda x: self.rel_domain(x),
@@ -296,46 +657,69 @@ class Algebra:
                                     list(self.relset(relset))
                                     ))))
 
-    def check_composition_identity(self, verbose=False):
-        """Check the validity of the composition identity for every
-        combination of singleton relset.  :param verbose: Print out
-        the details of each test :return: True or False
-
+    def check_composition_identity(self, verbose=False, exhaustive=False):
+        """Check the validity of the composition identity, (r * s) = (si * ri)i, for every
+        combination of singleton relset, or, if exhaustive, for every pair of non-empty relsets
+        (see validation_masks).  The checks are all done at once, on arrays of bit masks.
+        :param verbose: Print out the details of each failed test
+        :param exhaustive: Check every pair of non-empty relsets, not just the singletons
+        :return: True or False
         """
-        count = 0
-        result = True
-        rels = self.elements
-        for r in rels:
-            r_rs = self.relset((r,))
-            for s in rels:
-                count += 1
-                s_rs = self.relset((s,))
-                prod1 = self.compose(r_rs, s_rs)
-                prod2 = self.converse(self.compose(self.converse(s_rs), self.converse(r_rs)))
-                if prod1 != prod2:
-                    if verbose:
-                        print("FAIL:")
-                        print(f"      r    = {r_rs}")
-                        print(f"      s    = {s_rs}")
-                        print(f"( r *  s)  = {prod1}")
-                        print(f"(si * ri)i = {prod2}")
-                        print(f"{prod1} != {prod2}")
-                    result = False
+        masks = self.validation_masks(exhaustive)
+        conv = self.converse_many(masks)
+        prod1 = self.compose_many(masks[:, np.newaxis], masks[np.newaxis, :])
+        prod2 = self.converse_many(self.compose_many(conv[np.newaxis, :], conv[:, np.newaxis]))
+        failures = np.argwhere(prod1 != prod2)
         if verbose:
+            fromint = self.elements_bitset.fromint
+            for i, j in failures.tolist():
+                print("FAIL:")
+                print(f"      r    = {fromint(int(masks[i]))}")
+                print(f"      s    = {fromint(int(masks[j]))}")
+                print(f"( r *  s)  = {fromint(int(prod1[i, j]))}")
+                print(f"(si * ri)i = {fromint(int(prod2[i, j]))}")
             print(f"\n{self.name} -- Composition Identity Check:")
-        if result:
-            if verbose:
-                print(f"PASSED . {count} products tested.")
-        else:
-            if verbose:
-                print("FAILED. See FAILURE output above.")
-        return result
+            if len(failures):
+                print(f"FAILED. {len(failures)} of {prod1.size} products failed. See FAILURE output above.")
+            else:
+                print(f"PASSED . {prod1.size} products tested.")
+        return not len(failures)
+
+    def validation_masks(self, exhaustive=False):
+        """Return an array of the bit masks of the relsets checked by check_composition_identity
+        and is_associative: the singletons or, if exhaustive, every non-empty relset.  Since the
+        number of triples of relsets grows as 8 ** (number of relations), exhaustive checks are
+        limited to algebras with no more than FULL_TABLE_MAX_ELEMENTS relations."""
+        num_rels = len(self.elements)
+        if not exhaustive:
+            return np.array([1 << i for i in range(num_rels)], dtype=self.mask_dtype)
+        if num_rels > FULL_TABLE_MAX_ELEMENTS:
+            raise ValueError(f"{self.name} has {num_rels} relations; exhaustive checks are limited "
+                             f"to algebras with at most {FULL_TABLE_MAX_ELEMENTS}")
+        return np.arange(1, 1 << num_rels, dtype=self.mask_dtype)
+
+    def __composable(self, masks):
+        """Return a boolean array where [i, j] is True if the relsets, masks[i] and masks[j],
+        can be composed, i.e., if some range class of the first is a domain class of the second."""
+        classes = sorted(set(flatten([self.rel_domain(rel) + self.rel_range(rel) for rel in self.elements])))
+        class_bits = {cls: 1 << i for i, cls in enumerate(classes)}
+        rel_range_bits = [sum(class_bits[cls] for cls in set(self.rel_range(rel))) for rel in self.elements]
+        rel_domain_bits = [sum(class_bits[cls] for cls in set(self.rel_domain(rel))) for rel in self.elements]
+
+        def relset_bits(rel_bits):
+            return np.array([reduce(lambda bits, i: bits | rel_bits[i],
+                                    (i for i in range(len(rel_bits)) if mask >> i & 1), 0)
+                             for mask in masks.tolist()])
+
+        return (relset_bits(rel_range_bits)[:, np.newaxis] & relset_bits(rel_domain_bits)[np.newaxis, :]) != 0
 
     def summary(self):
         """Print out a summary of this algebra and its elements."""
         print(f"  Algebra Name: {self.name}")
         print(f"   Description: {self.description}")
         print(f" Equality Rels: {self.all_equality_relations}")
+        table_kind = "full" if self.full_composition_table is not None else "chunked"
+        print(f"  Comp. Tables: {self.composition_table_nbytes:,} bytes ({table_kind})")
         print("     Relations:")
         print("{:>25s} {:>25s} {:>10s} {:>10s} {:>10s} {:>8s} {:>12s}".format("NAME (SYMBOL)", "CONVERSE (ABBREV)",
                                                                               "REFLEXIVE", "SYMMETRIC", "TRANSITIVE",
@@ -363,60 +747,44 @@ class Algebra:
         print(f"          Is Transitive?: {self.rel_transitive(rel_string_name)}")
         print(f"Is an Equality Relation?: {self.rel_equality(rel_string_name)}")
 
-    def is_associative(self, verbose=False):
-        result = True
-        count_skipped = 0
+    def is_associative(self, verbose=False, exhaustive=False):
+        """Check that (a * b) * c = a * (b * c) for every triple of singleton relsets, or, if
+        exhaustive, for every triple of non-empty relsets (see validation_masks).  Triples where
+        the ranges of a don't overlap the domains of b, or the ranges of b don't overlap the
+        domains of c, are skipped.  The checks are done on arrays of bit masks, a block of values
+        of a at a time.
+        :param verbose: Print out the details of each failed test, and a summary
+        :param exhaustive: Check every triple of non-empty relsets, not just the singletons
+        :return: True or False
+        """
+        masks = self.validation_masks(exhaustive)
+        num_masks = len(masks)
+        composable = self.__composable(masks)
+        prod_bc = self.compose_many(masks[:, np.newaxis], masks[np.newaxis, :])
+        block = max(1, (1 << 22) // (num_masks * num_masks))
         count_ok = 0
         count_failed = 0
-        count_total = 0
-        rels = self.elements
-        for _a in rels:
-            for _b in rels:
-                for _c in rels:
-                    if verbose:
-                        print(f"{_a} x {_b} x {_c} :")
-                    a_rs = self.relset((_a,))
-                    b_rs = self.relset((_b,))
-                    c_rs = self.relset((_c,))
-                    if set(self.rel_range(_a)) & set(self.rel_domain(_b)):
-                        prod_ab = a_rs * b_rs
-                        prod_ab_c = prod_ab * c_rs
-                        if set(self.rel_range(_b)) & set(self.rel_domain(_c)):
-                            prod_bc = b_rs * c_rs
-                            prod_a_bc = a_rs * prod_bc
-                            if not (prod_ab_c == prod_a_bc):
-                                if verbose:
-                                    print(f"  Associativity fails for a = {a_rs}, b = {b_rs}, c = {c_rs}")
-                                    print(
-                                        f"    associativity check: {self.rel_range(_a)}::{self.rel_domain(_b)} \
-                                        {self.rel_range(_b)}::{self.rel_domain(_c)}")
-                                    print(f"    (a * b) * c = {prod_ab_c}")
-                                    print(f"    a * (b * c) = {prod_a_bc}")
-                                count_failed += 1
-                                count_total += 1
-                                result = False
-                            else:
-                                if verbose:
-                                    print("  Associativity OK")
-                                count_ok += 1
-                                count_total += 1
-                        else:
-                            if verbose:
-                                print(
-                                    f"  Skipping check due to b x c: {self.rel_range(_b)}::{self.rel_domain(_c)}")
-                            count_skipped += 1
-                            count_total += 1
-                    else:
-                        if verbose:
-                            print(f"  Skipping check due to a x b: {self.rel_range(_a)}::{self.rel_domain(_b)}")
-                        count_skipped += 1
-                        count_total += 1
-        print(f"TEST SUMMARY: {count_ok} OK, {count_skipped} Skipped, {count_failed} Failed ({count_total} Total)")
-        numrels = len(rels)
-        total_tests = numrels * numrels * numrels
-        if count_total != total_tests:
-            print(f"Test counts do not add up; Total should be {total_tests}")
-        return result
+        for start in range(0, num_masks, block):
+            a = masks[start:start + block, np.newaxis, np.newaxis]
+            prod_ab = prod_bc[start:start + block, :, np.newaxis]
+            prod_ab_c = self.compose_many(prod_ab, masks[np.newaxis, np.newaxis, :])
+            prod_a_bc = self.compose_many(a, prod_bc[np.newaxis, :, :])
+            checked = composable[start:start + block, :, np.newaxis] & composable[np.newaxis, :, :]
+            failed = checked & (prod_ab_c != prod_a_bc)
+            count_ok += int(np.count_nonzero(checked)) - int(np.count_nonzero(failed))
+            count_failed += int(np.count_nonzero(failed))
+            if verbose:
+                fromint = self.elements_bitset.fromint
+                for i, j, k in np.argwhere(failed).tolist():
+                    print(f"  Associativity fails for a = {fromint(int(masks[start + i]))}, "
+                          f"b = {fromint(int(masks[j]))}, c = {fromint(int(masks[k]))}")
+                    print(f"    (a * b) * c = {fromint(int(prod_ab_c[i, j, k]))}")
+                    print(f"    a * (b * c) = {fromint(int(prod_a_bc[i, j, k]))}")
+        if verbose:
+            count_total = num_masks ** 3
+            count_skipped = count_total - count_ok - count_failed
+            print(f"TEST SUMMARY: {count_ok} OK, {count_skipped} Skipped, {count_failed} Failed ({count_total} Total)")
+        return not count_failed
 
     def print_compact_transitivity_table(self):
         """This function's only purpose was to convert the original transitivity table format
@@ -448,19 +816,207 @@ class Algebra:
         return rels_equiv and tbls_equiv
 
 
+# The directory of algebra definitions, in this repository, that AlgebraRegistry searches by default.
+ALGEBRAS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Algebras")
+
+
+class AlgebraRegistry:
+    """Loads each algebra only once, however many times it's referred to, e.g., by the
+    networks read from a directory of network JSON files.  Algebras are found by name
+    in a list of directories, or by path, and interned by the SHA-256 hash of their JSON
+    definitions, so that identical definitions share a single Algebra.  The algebras
+    handed out are shared by every network that refers to them, so a change to one (e.g.,
+    to its algebra_dict) is seen by all of them.  Only an algebra's tables are protected
+    from that, as read-only NumPy arrays; the rest of it is an ordinary mutable object, and
+    must be left alone.  The registry can be used from multiple threads, as can the
+    algebras themselves, since the only state they create after loading (e.g., the scalar
+    composition tables) is created the same way by any thread that gets to it first."""
+
+    def __init__(self, algebra_paths=(ALGEBRAS_PATH,), json_ext=".json"):
+        self.algebra_paths = list(algebra_paths)
+        self.json_ext = json_ext
+        self.__lock = threading.Lock()
+        self.__by_file = dict()  # (real path, modification time, size) --> Algebra
+        self.__by_hash = dict()  # SHA-256 hash of algebra definition --> Algebra
+
+    def __len__(self):
+        """The number of distinct algebras loaded."""
+        return len(self.__by_hash)
+
+    def resolve(self, name, algebra_path=None, json_ext=None):
+        """Return the path to the JSON file that defines the algebra, name, looking first in
+        algebra_path, if given, then in this registry's directories.  The name can also be a
+        path to the algebra's file, with or without its extension."""
+        ext = self.json_ext if json_ext is None else json_ext
+        paths = [name] if algebra_path is None else [os.path.join(algebra_path, name)]
+        paths += [os.path.join(path, name) for path in self.algebra_paths]
+        for path in paths:
+            for file_name in (path + ext, path):
+                if os.path.isfile(file_name):
+                    return file_name
+        raise ValueError(f"Algebra {name} not found in {paths}")
+
+    def get(self, name, algebra_path=None, json_ext=None):
+        """Return the algebra, name, loading it on first use (see resolve)."""
+        file_name = os.path.realpath(self.resolve(name, algebra_path, json_ext))
+        stat = os.stat(file_name)
+        file_key = (file_name, stat.st_mtime_ns, stat.st_size)
+        algebra = self.__by_file.get(file_key)
+        if algebra is None:
+            with self.__lock:
+                algebra = self.__by_file.get(file_key)
+                if algebra is None:
+                    with open(file_name, 'r') as f:
+                        algebra = self.__intern(json.load(f))
+                    self.__by_file[file_key] = algebra
+        return algebra
+
+    def intern(self, algebra_dict):
+        """Return the registered algebra defined by algebra_dict, creating it if needed."""
+        with self.__lock:
+            return self.__intern(algebra_dict)
+
+    def __intern(self, algebra_dict):
+        """The lock must be held."""
+        key = hashlib.sha256(json.dumps(algebra_dict, sort_keys=True).encode()).hexdigest()
+        algebra = self.__by_hash.get(key)
+        if algebra is None:
+            algebra = Algebra(alg_dict=algebra_dict)
+            self.__by_hash[key] = algebra
+        return algebra
+
+    def clear(self):
+        """Forget all of the loaded algebras."""
+        with self.__lock:
+            self.__by_file.clear()
+            self.__by_hash.clear()
+
+
+# The registry used to load the algebras named in network JSON files
+algebra_registry = AlgebraRegistry()
+
+
 class InconsistentNetwork(Exception):
     """An exception used to break out of Network propagation when an inconsistency is found."""
     pass
 
 
+def vectorized_path_consistency(algebra, matrix):
+    """Propagate the constraints in a square array of relation set bit masks, in place,
+    treating propagation as a matrix product where the algebra's composition plays the role
+    of multiplication and intersection plays the role of addition.  Each sweep folds in the
+    products through one intermediate entity, k, at a time, as a whole-matrix operation on
+    column k times row k.  Sweeps are repeated until the matrix stops changing.
+    If the network is inconsistent the matrix is left as it was before the products that
+    emptied a constraint were folded in, so it holds no empty constraints other than any it
+    started with.
+    :return: The number of sweeps performed
+    :raises InconsistentNetwork: If any constraint is, or becomes, empty
+    """
+    if not matrix.all():
+        raise InconsistentNetwork
+    sweeps = 0
+    something_changed = True
+    while something_changed:
+        something_changed = False
+        sweeps += 1
+        for k in range(matrix.shape[0]):
+            # Compose only the distinct values in column k with those in row k, then spread
+            # the products out over the whole matrix.
+            col_values, col_index = np.unique(matrix[:, k], return_inverse=True)
+            row_values, row_index = np.unique(matrix[k, :], return_inverse=True)
+            products = algebra.compose_many(col_values[:, np.newaxis], row_values[np.newaxis, :])
+            prod = matrix & products.take(row_index, axis=1)[col_index]
+            if not np.array_equal(prod, matrix):
+                if not prod.all():
+                    raise InconsistentNetwork
+                something_changed = True
+                matrix[...] = prod
+    return sweeps
+
+
+def batch_path_consistency(algebra, matrices):
+    """Propagate the constraints in a stack of square arrays of relation set bit masks (i.e.,
+    a (batch, n, n) array holding many independent networks of the same size), in place, all
+    at once.  As in vectorized_path_consistency, each sweep folds in the products through one
+    intermediate entity, k, at a time, here for every network in the batch.  A network drops
+    out of the batch once it stops changing, or becomes inconsistent, in which case it's left
+    partially propagated.
+    :return: A boolean array, with True for each network that's consistent
+    """
+    consistent = np.ones(matrices.shape[0], dtype=bool)
+    active = np.arange(matrices.shape[0])
+    while active.size:
+        work = matrices[active]
+        before = work.copy()
+        for k in range(matrices.shape[1]):
+            work &= algebra.compose_many(work[:, :, k, np.newaxis], work[:, np.newaxis, k, :])
+        matrices[active] = work
+        inconsistent = ~work.all(axis=(1, 2))
+        consistent[active[inconsistent]] = False
+        active = active[(work != before).any(axis=(1, 2)) & ~inconsistent]
+    return consistent
+
+
+def min_fill_in_triangulation(graph):
+    """Compute a chordal completion of an undirected networkx Graph by eliminating its nodes
+    one at a time, always choosing a node whose elimination adds the fewest edges (fill-in)
+    between its remaining neighbors.  Only the nodes whose fill-in can change are re-scored
+    after each elimination.
+    :return: A tuple (chordal graph, elimination order, list of fill-in edges)
+    """
+    chordal = nx.Graph(graph)
+    remaining = {node: set(graph[node]) - {node} for node in graph}
+    order_of = {node: num for num, node in enumerate(graph)}
+
+    def fill_in(node):
+        nbrs = list(remaining[node])
+        return sum(1 for num, nbr1 in enumerate(nbrs) for nbr2 in nbrs[num + 1:]
+                   if nbr2 not in remaining[nbr1])
+
+    scores = {node: fill_in(node) for node in remaining}
+    heap = [(score, order_of[node], node) for node, score in scores.items()]
+    heapq.heapify(heap)
+    elimination_order = []
+    fill_edges = []
+    while heap:
+        score, _, node = heapq.heappop(heap)
+        if node not in remaining or scores[node] != score:
+            continue  # Eliminated already, or a stale score
+        nbrs = list(remaining.pop(node))
+        elimination_order.append(node)
+        affected = set(nbrs)
+        for nbr in nbrs:
+            remaining[nbr].discard(node)
+        for num, nbr1 in enumerate(nbrs):
+            for nbr2 in nbrs[num + 1:]:
+                if nbr2 not in remaining[nbr1]:
+                    remaining[nbr1].add(nbr2)
+                    remaining[nbr2].add(nbr1)
+                    chordal.add_edge(nbr1, nbr2)
+                    fill_edges.append((nbr1, nbr2))
+                    affected.update(remaining[nbr1] & remaining[nbr2])
+        for other in affected:
+            scores[other] = fill_in(other)
+            heapq.heappush(heap, (scores[other], order_of[other], other))
+    return chordal, elimination_order, fill_edges
+
+
 class Network(nx.DiGraph):
     """A directed graph consisting of entities as nodes (e.g., SpatialEntity or TemporalEntity)
     and with labeled edges, where the labels are sets of relations from a Relation Algebra that
-    represent disjunctions of constraints between the entities."""
+    represent disjunctions of constraints between the entities.
+
+    A sparse network (sparse=True) never stores an edge labeled with all of the algebra's
+    elements (i.e., the universal relation set).  Instead, a missing edge between two entities
+    is treated as if it were labeled that way.  Note that singleton labelings (see
+    all_singleton_labelings) only expand the edges that are actually stored."""
 
     def __init__(self, algebra=None, name=None,
                  algebra_path=None, json_file_name=None, network_dict=None,
-                 json_ext=".json"):
+                 json_ext=".json", sparse=False):
+
+        self.sparse = sparse
 
         # Create the network in dictionary form (net_dict)
         if json_file_name:
@@ -480,9 +1036,9 @@ class Network(nx.DiGraph):
         # If an algebra was input, use it...
         if algebra:
             self.algebra = algebra
-        # ...otherwise read the required algebra from a JSON file.
+        # ...otherwise get the required algebra, read from a JSON file only the first time it's used.
         else:
-            self.algebra = Algebra(os.path.join(algebra_path, net_dict["algebra"]) + json_ext)
+            self.algebra = algebra_registry.get(net_dict["algebra"], algebra_path, json_ext)
 
         # TODO: Make name & description attributes of the DiGraph
         if "name" in net_dict:
@@ -502,7 +1058,13 @@ class Network(nx.DiGraph):
         for node_name, node_classes in nodes.items():
             entities[node_name] = class_type_dict[node_classes[0]](node_classes, node_name)
 
-        # Initialize the superclass
+        # Initialize the superclass, and the index of entities by name that's
+        # maintained by the node and edge adding/removing methods, further below,
+        # as is the trail of changes to be undone by rollback (see checkpoint).
+        self.__entity_index = dict()
+        self.__duplicate_names = set()
+        self.__trail = None
+        self.__checkpoints = []
         super().__init__(name=make_name(name))
 
         # Add the constraint to the network as an attribute on an edge
@@ -520,6 +1082,187 @@ class Network(nx.DiGraph):
     def __str__(self):
         return f"<Network--{self.name}--{self.algebra.name}>"
 
+    # The following overrides of networkx methods keep the index of entities by name (see
+    # get_entity) in sync with the nodes of the network, and record the changes that they
+    # make on the trail, if there is one (see checkpoint).
+
+    def __index_entity(self, entity):
+        """Add a new node (entity) to the name index.  If another entity already has the
+        same name, then it is reported, and the first entity remains in the index."""
+        if self.__trail is not None:
+            self.__trail.append((entity, None, True))
+        indexed = self.__entity_index.setdefault(entity.name, entity)
+        if indexed is not entity:
+            self.__duplicate_names.add(entity.name)
+            warnings.warn(f"{self.name} already has an entity named '{entity.name}'; "
+                          f"get_entity('{entity.name}') will return the first one")
+
+    def __unindex_entity(self, entity):
+        """Remove a node (entity) from the name index."""
+        if self.__entity_index.get(entity.name) is entity:
+            del self.__entity_index[entity.name]
+            if entity.name in self.__duplicate_names:
+                # Make the next entity with the same name visible
+                for node in self._node:
+                    if node is not entity and node.name == entity.name:
+                        self.__entity_index[entity.name] = node
+                        break
+
+    def __indexing_nodes(self, nodes):
+        """Index the new nodes in an iterable of nodes, or (node, attr_dict) tuples, as they're consumed."""
+        for item in nodes:
+            entity = item[0] if isinstance(item, tuple) else item
+            if entity not in self._node:
+                self.__index_entity(entity)
+            yield item
+
+    def __indexing_edges(self, edges):
+        """Index the new nodes in an iterable of edges, as they're consumed."""
+        for edge in edges:
+            for entity in dict.fromkeys(edge[:2]):
+                if entity not in self._node:
+                    self.__index_entity(entity)
+            if self.__trail is not None:
+                self.__record(edge[0], edge[1])
+            yield edge
+
+    def add_node(self, node_for_adding, **attr):
+        if node_for_adding not in self._node:
+            self.__index_entity(node_for_adding)
+        super().add_node(node_for_adding, **attr)
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        super().add_nodes_from(self.__indexing_nodes(nodes_for_adding), **attr)
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        if u_of_edge not in self._node:
+            self.__index_entity(u_of_edge)
+        if v_of_edge not in self._node and v_of_edge is not u_of_edge:
+            self.__index_entity(v_of_edge)
+        if self.__trail is not None:
+            self.__record(u_of_edge, v_of_edge)
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        super().add_edges_from(self.__indexing_edges(ebunch_to_add), **attr)
+
+    def remove_edge(self, u, v):
+        if self.__trail is not None and self.has_edge(u, v):
+            self.__record(u, v)
+        super().remove_edge(u, v)
+
+    def remove_edges_from(self, ebunch):
+        ebunch = list(ebunch)
+        if self.__trail is not None:
+            for u, v in dict.fromkeys(edge[:2] for edge in ebunch):
+                if self.has_edge(u, v):
+                    self.__record(u, v)
+        super().remove_edges_from(ebunch)
+
+    def clear_edges(self):
+        if self.__trail is not None:
+            for u, v in self.edges:
+                self.__record(u, v)
+        super().clear_edges()
+
+    def remove_node(self, n):
+        if self.__trail is not None and n in self._node:
+            self.__record_removal(n)
+        super().remove_node(n)
+        self.__unindex_entity(n)
+
+    def remove_nodes_from(self, nodes):
+        nodes = list(nodes)
+        if self.__trail is not None:
+            for node in nodes:
+                if node in self._node:
+                    self.__record_removal(node)
+        super().remove_nodes_from(nodes)
+        for node in nodes:
+            if node not in self._node:
+                self.__unindex_entity(node)
+
+    def clear(self):
+        """Remove all nodes and edges, and discard any checkpoints (see checkpoint)."""
+        super().clear()
+        self.__entity_index.clear()
+        self.__duplicate_names.clear()
+        self.__trail = None
+        self.__checkpoints.clear()
+
+    # A trail of changes to the network, which allows search and "what if" analysis to try
+    # out constraints and then undo them, without copying the network.  Each entry on the
+    # trail is either (tail, head, constraint), where constraint was on the edge before it
+    # changed (None if there was no edge), or (entity, None, added), where added is True if
+    # the entity was added to the network, and False if it was removed, or (entity, None,
+    # classes), where classes is the list of the entity's classes before they changed.
+
+    def checkpoint(self):
+        """Start recording changes to the network so that they can be undone by rollback, or
+        kept by commit.  Checkpoints can be nested; rollback and commit apply to the most
+        recent one.
+        :return: The number of checkpoints in effect
+        """
+        if self.__trail is None:
+            self.__trail = []
+        self.__checkpoints.append(len(self.__trail))
+        return len(self.__checkpoints)
+
+    def rollback(self):
+        """Undo every change made to the network since the most recent checkpoint, and
+        discard that checkpoint.  The time taken is proportional to the number of changes."""
+        if not self.__checkpoints:
+            raise ValueError("There is no checkpoint to roll back to")
+        marker = self.__checkpoints.pop()
+        trail = self.__trail
+        self.__trail = None  # Don't record the undoing
+        while len(trail) > marker:
+            tail, head, old = trail.pop()
+            if head is None:
+                if isinstance(old, list):
+                    tail.classes = old
+                elif old:
+                    self.remove_node(tail)
+                else:
+                    self.add_node(tail)
+            elif old is None:
+                self.remove_edge(tail, head)
+            elif head in self._succ[tail]:
+                self._succ[tail][head]['constraint'] = old
+            else:
+                self.add_edge(tail, head, constraint=old)
+        self.__trail = trail if self.__checkpoints else None
+
+    def commit(self):
+        """Keep the changes made to the network since the most recent checkpoint, and discard
+        that checkpoint.  (They can still be undone by rolling back an earlier checkpoint.)"""
+        if not self.__checkpoints:
+            raise ValueError("There is no checkpoint to commit")
+        self.__checkpoints.pop()
+        if not self.__checkpoints:
+            self.__trail = None
+
+    def __record(self, tail, head):
+        """Put the current constraint on the edge from tail to head (or None, if there is no
+        such edge) on the trail."""
+        edge = self._succ.get(tail, {}).get(head)
+        self.__trail.append((tail, head, None if edge is None else edge['constraint']))
+
+    def __record_removal(self, entity):
+        """Put an entity that's about to be removed, and its edges, on the trail."""
+        for head in self._succ[entity]:
+            self.__record(entity, head)
+        for tail in self._pred[entity]:
+            if tail is not entity:
+                self.__record(tail, entity)
+        self.__trail.append((entity, None, False))
+
+    def __set_classes(self, entity, classes):
+        """Set an entity's classes, putting its current classes on the trail, if they change."""
+        if self.__trail is not None and classes != entity.classes:
+            self.__trail.append((entity, None, entity.classes))
+        entity.classes = classes
+
     def remove_constraint(self, entity1, entity2):
         """Removes the directed edge between the two entities, where entity1 is the tail
         and entity2 is the head of the edge."""
@@ -546,6 +1289,21 @@ class Network(nx.DiGraph):
                 if (ent1 != ent2) and not self.has_edge(ent1, ent2):
                     self.add_constraint(ent1, ent2, self.algebra.elements, verbose)
 
+    def __to_relset(self, relation_set):
+        """Handle different expressions for a relation set."""
+        # If None, then use all relations (elements) as constraint
+        if not relation_set:
+            return self.algebra.elements
+        # If it's a string, assume it's in the form 'a' or 'a|b|c'
+        elif isinstance(relation_set, str):
+            return self.algebra.string_to_relset(relation_set)
+        # Or maybe it's actually a RelSet
+        elif isinstance(relation_set, RelSet):
+            return relation_set
+        # Otherwise, throw an exception
+        else:
+            raise TypeError("relation_set must be None, a String, or a RelSet")
+
     def add_constraint(self, entity1, entity2, relation_set=None, verbose=False):
         """Same as add_edge, except that two edges are added with converse constraints."""
 
@@ -564,19 +1322,11 @@ class Network(nx.DiGraph):
         # Override any previously set constraint on this pair of entities
         self.remove_constraint(entity1, entity2)
 
-        # Handle different expressions for a relation set:
-        # If None, then use all relations (elements) as constraint
-        if not relation_set:
-            rel_set = self.algebra.elements
-        # If it's a string, assume it's in the form 'a' or 'a|b|c'
-        elif isinstance(relation_set, str):
-            rel_set = self.algebra.string_to_relset(relation_set)
-        # Or maybe it's actually a RelSet
-        elif isinstance(relation_set, RelSet):
-            rel_set = relation_set
-        # Otherwise, throw an exception
-        else:
-            raise TypeError("relation_set must be None, a String, or a RelSet")
+        rel_set = self.__to_relset(relation_set)
+
+        # A sparse network leaves unconstrained pairs of entities without edges
+        if self.sparse and rel_set == self.algebra.elements:
+            return
 
         # Add the constraint and it's converse
         rel_set_converse = self.algebra.converse(rel_set)
@@ -589,15 +1339,36 @@ class Network(nx.DiGraph):
 
     def set_constraint(self, tail, head, relset):
         """Assuming that an edge exists between tail & head, this function destructively changes
-         whatever constraint was between them to be relset"""
+         whatever constraint was between them to be relset.  (In a sparse network, the edge
+         is added, or removed if relset is universal, as needed.)"""
+        if self.sparse and tail != head:
+            self.remove_constraint(tail, head)
+            if relset != self.algebra.elements:
+                self.add_edge(tail, head, constraint=relset)
+                self.add_edge(head, tail, constraint=self.algebra.converse(relset))
+            return
+        if self.__trail is not None:
+            self.__record(tail, head)
+            if tail != head:
+                self.__record(head, tail)
         self.edges[tail, head]['constraint'] = relset
         # Don't bother looking at the converse for equality relations
         if tail != head:
             self.edges[head, tail]['constraint'] = self.algebra.converse(relset)
 
+    def __constraint_on(self, tail, head):
+        """Return the constraint (RelSet) on the edge from tail to head, where, in a sparse
+        network, a missing edge means that any relation is possible."""
+        edge = self._succ[tail].get(head)
+        if edge is None:
+            if self.sparse and head in self._node:
+                return self.algebra.elements
+            raise KeyError((tail, head))
+        return edge['constraint']
+
     def __add__(self, other):
         """Combine this network with another network, and return the new, combined network."""
-        new_net = Network(self.algebra, "")
+        new_net = Network(self.algebra, "", sparse=(self.sparse and other.sparse))
         new_net.graph.update(other.graph)
         new_net.graph.update(self.graph)
         new_net.add_nodes_from(other.nodes(data=True))
@@ -608,14 +1379,10 @@ class Network(nx.DiGraph):
         return new_net
 
     def get_entity(self, name):
-        """Return the node (entity) with the input name. If more than one have the same name,
-        then the first one found is returned.  So, try to give entities different names."""
-        result = None
-        for node in self.nodes:
-            if node.name == name:
-                result = node
-                break
-        return result
+        """Return the node (entity) with the input name, or None if there isn't one.  If more
+        than one have the same name, then the first one added is returned (and the duplicate
+        was reported when it was added).  So, try to give entities different names."""
+        return self.__entity_index.get(name)
 
     def get_entities(self, name_list):
         """Return an iterator over entities with the names in 'name_list', in the order
@@ -627,7 +1394,7 @@ class Network(nx.DiGraph):
         Edge corresponding to the input src/Target Names."""
         source_node = self.get_entity(source_name)
         target_node = self.get_entity(target_name)
-        con = str(self.edges[source_node, target_node]['constraint'])
+        con = str(self.__constraint_on(source_node, target_node))
         if return_names:
             return source_name, target_name, con
         else:
@@ -647,52 +1414,418 @@ class Network(nx.DiGraph):
         for row_ent in entities:
             row = []
             for col_ent in entities:
-                row.append(str(self.edges[row_ent, col_ent]['constraint']))
+                row.append(str(self.__constraint_on(row_ent, col_ent)))
             result.append(row)
         return result
 
-    def propagate(self, verbose=False):
+    def propagate(self, verbose=False, method=None, workers=None):
         """Propagate constraints in the network. Constraint propagation is a fixed-point
         iteration of a square constraint matrix.  That is, we treat the network as if it's
         a matrix, multiplying it by itself, repeatedly, until it stops changing.
         The algebra's compose method plays the role of multiplication and the RelSet +
         operation plays the role of addition in the constraint matrix multiplication.
-        :param verbose: If True, then the number of iterations required is printed
+        :param verbose: If True, then the amount of work required is printed
+        :param method: "sweep" (the default for dense networks) re-examines every triangle of
+        nodes until nothing changes; "queue" (the default for sparse networks) only re-examines
+        the triangles that touch an edge whose constraint has changed (PC-2); "vectorized"
+        performs the matrix product with NumPy (see vectorized_path_consistency).  All of them
+        arrive at the same network.  "ppc" enforces partial path consistency, propagating only
+        over the triangles of a chordal completion of the network (see chordal_completion);
+        it's much cheaper for large sparse networks, but only tightens the constraints between
+        entities that are adjacent in the completion.  A sparse network supports all but
+        "sweep", and continues to omit universal edges afterwards.  "points" (the default for
+        networks over a linear point algebra, whose constraints are all convex) arrives at
+        the same network using graph reachability (see PointNetworkSolver); it's also the
+        default for interval networks that can be rewritten as such point networks (see
+        IntervalPointReducer).
+        If the algebra's universal relation set is absorbing (see Algebra.universal_is_absorbing),
+        then the constraints in different connected components of the network (see
+        constraint_components) can't affect each other, so each component is propagated by
+        itself, using the method given, and the results are merged back into the network.
+        :param workers: If greater than 1, the components are propagated in a pool of that
+        many processes
         :return: True if network is consistent, otherwise False
         """
-        loop_count = 0
-        self.__set_unconstrained_values(verbose)
-        something_changed = True  # We'll iterate at least once
+        if method == "sweep" and self.sparse:
+            raise ValueError("sweep is not supported on sparse networks; use queue, vectorized or ppc")
+        if self.algebra.universal_is_absorbing:
+            components = self.constraint_components()
+            if len(components) > 1:
+                return self.__propagate_components(components, verbose, method, workers)
+        reducer = None
+        if method is None:
+            if self.algebra.linear_point_relations:
+                if PointNetworkSolver.is_convex(self):
+                    method = "points"
+            else:
+                reducer = IntervalPointReducer.for_network(self)
+                if reducer:
+                    method = "points"
+            if method is None:
+                method = "queue" if self.sparse else "sweep"
+        if method == "sweep":
+            propagation_method = self.__propagate_sweep
+        elif method == "queue":
+            propagation_method = self.__propagate_sparse if self.sparse else self.__propagate_queue
+        elif method == "vectorized":
+            propagation_method = self.__propagate_vectorized
+        elif method == "ppc":
+            propagation_method = self.__propagate_ppc
+        elif method == "points":
+            # Use the reducer that was created, if any, in deciding on the method
+            def propagation_method(verbose):
+                self.__propagate_points(verbose, reducer)
+        else:
+            raise ValueError(f"Unknown propagation method: {method}")
+        if not self.sparse:
+            self.__set_unconstrained_values(verbose)
         try:
-            while something_changed:
-                something_changed = False  # If nothing changes, we'll only iterate once
-                loop_count += 1
-                for ent1 in self.nodes():
-                    for ent2 in self.nodes():
-                        prod = self.algebra.elements
-                        c12 = self.edges[ent1, ent2]['constraint']
-                        for ent3 in self.nodes():
-                            c13 = self.edges[ent1, ent3]['constraint']
-                            c32 = self.edges[ent3, ent2]['constraint']
-                            prod += self.algebra.compose(c13, c32)
-                        if prod != c12:
-                            something_changed = True  # Continue iterating
-                        self.edges[ent1, ent2]['constraint'] = prod
-                        # If any product is empty then the Network is inconsistent
-                        if not prod.any():
-                            raise InconsistentNetwork
-            # Update the Entity/Node classes to reflect changes due to constraint propagation
-            for nd in self.nodes():
-                # Only consider domains since the edges below are from the node to itself
-                nd.classes = list(self.algebra.get_domain_classes(self.edges[nd, nd]['constraint']))
+            propagation_method(verbose)
+            self.__update_entity_classes()
+            return True
+        except InconsistentNetwork:
             if verbose:
-                print(f"Number of iterations: {loop_count}")
+                print(f"Propagation suspended; the network is inconsistent.")
+            return False
+
+    def constraint_components(self):
+        """Return the connected components of the graph of the network's explicit constraints,
+        i.e., those other than the universal relation set, as lists of entities, in the order
+        of the network's nodes.  The largest components come first."""
+        universal = self.algebra.elements
+        graph = nx.Graph()
+        graph.add_nodes_from(self.nodes)
+        graph.add_edges_from((tail, head) for tail, head, relset in self.edges(data='constraint')
+                             if tail is not head and relset != universal)
+        order = {entity: index for index, entity in enumerate(self.nodes)}
+        return sorted((sorted(component, key=order.get) for component in nx.connected_components(graph)),
+                      key=len, reverse=True)
+
+    def __propagate_components(self, components, verbose, method, workers):
+        """Propagate each of the connected components by itself, with propagate_component, and
+        copy the results back into the network.  An inconsistent component is left partially
+        propagated, as the whole network would be.
+        :return: True if all of the components are consistent, otherwise False
+        """
+        if verbose:
+            print(f"Number of components: {len(components)}")
+        universal = self.algebra.elements
+        tasks = []
+        for component in components:
+            index = {entity: i for i, entity in enumerate(component)}
+            edges = [(index[tail], index[head], int(data['constraint'])) for tail in component
+                     for head, data in self._adj[tail].items() if data['constraint'] != universal]
+            tasks.append((self.name, self.sparse, method,
+                          [(entity.name, entity.classes) for entity in component], edges))
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_propagation_worker,
+                                     initargs=(self.algebra.algebra_dict,)) as executor:
+                results = list(executor.map(_propagate_component_worker, tasks,
+                                            chunksize=max(1, len(tasks) // (4 * workers))))
+        else:
+            results = [propagate_component(self.algebra, task) for task in tasks]
+        adj = self._adj
+        fromint = self.algebra.elements_bitset.fromint
+        for component, (_, edges, classes) in zip(components, results):
+            for i, j, mask in edges:
+                ent1, ent2 = component[i], component[j]
+                relset = fromint(mask)
+                if ent2 in adj[ent1]:
+                    if self.__trail is not None and relset != adj[ent1][ent2]['constraint']:
+                        self.__record(ent1, ent2)
+                    adj[ent1][ent2]['constraint'] = relset
+                else:
+                    self.add_edge(ent1, ent2, constraint=relset)
+            for entity, entity_classes in zip(component, classes):
+                self.__set_classes(entity, entity_classes)
+        if not self.sparse:
+            self.__set_unconstrained_values(verbose)
+        consistent = all(result[0] for result in results)
+        if verbose and not consistent:
+            print(f"Propagation suspended; the network is inconsistent.")
+        return consistent
+
+    def __update_entity_classes(self):
+        """Update the Entity/Node classes to reflect changes due to constraint propagation."""
+        for nd in self.nodes():
+            # Only consider domains since the edges below are from the node to itself
+            self.__set_classes(nd, list(self.algebra.get_domain_classes(self.edges[nd, nd]['constraint'])))
+
+    def assert_constraint(self, entity1, entity2, relation_set, verbose=False):
+        """Add a constraint to a network that has already been propagated, and propagate its
+        consequences incrementally.  The relation set is intersected with the constraint
+        already on the edge (if any), and then only the triangles reachable from the edges
+        that change are re-examined, as in propagate(method="queue").  Either entity may be
+        new to the network.  If other entities have been added, with add_constraint, since
+        a dense network was last propagated, then the whole network is propagated instead.
+        :return: True if the network is still consistent, otherwise False
+        """
+        universal = self.algebra.elements
+        # Entities added with add_constraint since the network was propagated leave a dense
+        # network incomplete, and their constraints unpropagated, so propagate all of it.
+        unpropagated = not self.sparse and self.number_of_edges() < self.number_of_nodes() ** 2
+        new_entities = [entity for entity in {entity1, entity2} if not self.has_edge(entity, entity)]
+        changed_edges = [(entity, entity) for entity in new_entities]
+        if not self.has_edge(entity1, entity2):
+            self.add_constraint(entity1, entity2, universal, verbose)
+        # Like propagate, treat the entities as unconstrained wrt entities they have no edge to.
+        if self.sparse:
+            for entity in new_entities:
+                changed_edges += self.algebra.universal_edges_to_requeue(entity, self.nodes())
+        elif unpropagated:
+            self.__set_unconstrained_values(verbose)
+        else:
+            for entity in (entity1, entity2):
+                others = [other for other in self.nodes() if not self.has_edge(entity, other)]
+                for other in others:
+                    self.add_edge(entity, other, constraint=universal)
+                    self.add_edge(other, entity, constraint=universal)
+                changed_edges += self.algebra.universal_edges_to_requeue(entity, others)
+        old_constraint = self.__constraint_on(entity1, entity2)
+        new_constraint = old_constraint + self.__to_relset(relation_set)
+        if new_constraint != old_constraint:
+            self.set_constraint(entity1, entity2, new_constraint)
+            changed_edges += [(entity1, entity2), (entity2, entity1)]
+        try:
+            if not new_constraint.any():
+                raise InconsistentNetwork
+            if self.sparse:
+                self.__propagate_sparse(verbose, changed_edges)
+            elif unpropagated:
+                self.__propagate_queue(verbose)
+            else:
+                self.__propagate_queue(verbose, changed_edges)
+            self.__update_entity_classes()
             return True
         except InconsistentNetwork:
             if verbose:
                 print(f"Propagation suspended; the network is inconsistent.")
             return False
 
+    def __propagate_sweep(self, verbose):
+        """Sweep over every triangle of nodes, repeatedly, until no constraint changes."""
+        loop_count = 0
+        something_changed = True  # We'll iterate at least once
+        while something_changed:
+            something_changed = False  # If nothing changes, we'll only iterate once
+            loop_count += 1
+            for ent1 in self.nodes():
+                for ent2 in self.nodes():
+                    prod = self.algebra.elements
+                    c12 = self.edges[ent1, ent2]['constraint']
+                    for ent3 in self.nodes():
+                        c13 = self.edges[ent1, ent3]['constraint']
+                        c32 = self.edges[ent3, ent2]['constraint']
+                        prod += self.algebra.compose(c13, c32)
+                    if prod != c12:
+                        something_changed = True  # Continue iterating
+                        if self.__trail is not None:
+                            self.__record(ent1, ent2)
+                    self.edges[ent1, ent2]['constraint'] = prod
+                    # If any product is empty then the Network is inconsistent
+                    if not prod.any():
+                        raise InconsistentNetwork
+        if verbose:
+            print(f"Number of iterations: {loop_count}")
+
+    def __propagate_queue(self, verbose, edges=None):
+        """Path consistency driven by a queue of edges (PC-2, see [van Beek 1992]).
+        When the constraint on an edge, ent1-->ent2, shrinks, only the triangles that
+        contain that edge can be affected, so only those are re-examined.  If edges is
+        given, then only those edges are initially queued (see assert_constraint)."""
+        compose = self.algebra.compose
+        adj = self._adj
+        nodes = list(self.nodes())
+        if edges is None:
+            # Only constraints that become empty are caught below, so check for those already empty
+            if not all(cons for _, _, cons in self.edges(data='constraint')):
+                raise InconsistentNetwork
+            universal = self.algebra.elements
+            # If U;U = U, then a triangle with two universal edges cannot tighten its third
+            # edge, so universal edges need not be examined until they change.
+            skip_universal = (compose(universal, universal) == universal)
+            edges = ((ent1, ent2) for ent1 in nodes for ent2 in nodes
+                     if not (skip_universal and adj[ent1][ent2]['constraint'] == universal))
+        queue = deque(edges)
+        queued = set(queue)
+        edge_count = 0
+        trail = self.__trail
+
+        def tighten(tail, head, relset):
+            cons = adj[tail][head]['constraint']
+            prod = cons + relset
+            if prod != cons:
+                # If any product is empty then the Network is inconsistent
+                if not prod.any():
+                    raise InconsistentNetwork
+                if trail is not None:
+                    trail.append((tail, head, cons))
+                adj[tail][head]['constraint'] = prod
+                if (tail, head) not in queued:
+                    queue.append((tail, head))
+                    queued.add((tail, head))
+
+        while queue:
+            ent1, ent2 = queue.popleft()
+            queued.discard((ent1, ent2))
+            edge_count += 1
+            c12 = adj[ent1][ent2]['constraint']
+            for ent3 in nodes:
+                tighten(ent1, ent3, compose(c12, adj[ent2][ent3]['constraint']))
+                tighten(ent3, ent2, compose(adj[ent3][ent1]['constraint'], c12))
+        if verbose:
+            print(f"Number of edges processed: {edge_count}")
+
+    def __propagate_sparse(self, verbose, edges=None, third_nodes=None):
+        """The same algorithm as __propagate_queue, but for a sparse network, where missing edges
+        are universal.  When U;X = X;U = U, a triangle with a missing edge can only tighten that
+        edge, so only the neighbors of an edge's nodes need to be examined, and an edge is only
+        added when a constraint other than the universal one is derived for it.
+        third_nodes(ent1, ent2), if given, returns the nodes that complete the triangles
+        examined for the edge (ent1, ent2), in place of the neighbors."""
+        compose = self.algebra.compose
+        universal = self.algebra.elements
+        succ = self._succ
+        pred = self._pred
+        if third_nodes is None and self.algebra.universal_is_absorbing:
+            def third_nodes(ent1, ent2):
+                return list(succ[ent2]), list(pred[ent1])
+        elif third_nodes is None:
+            def third_nodes(ent1, ent2):
+                nodes = list(self._node)
+                return nodes, nodes
+        queue = deque(self.edges() if edges is None else edges)
+        queued = set(queue)
+        edge_count = 0
+        trail = self.__trail
+
+        def tighten(tail, head, relset):
+            if relset == universal:
+                return
+            edge = succ[tail].get(head)
+            if edge is None:
+                prod = relset
+                if not prod.any():
+                    raise InconsistentNetwork
+                self.add_edge(tail, head, constraint=prod)
+            else:
+                cons = edge['constraint']
+                prod = cons + relset
+                if prod == cons:
+                    return
+                if not prod.any():
+                    raise InconsistentNetwork
+                if trail is not None:
+                    trail.append((tail, head, cons))
+                edge['constraint'] = prod
+            if (tail, head) not in queued:
+                queue.append((tail, head))
+                queued.add((tail, head))
+
+        while queue:
+            ent1, ent2 = queue.popleft()
+            queued.discard((ent1, ent2))
+            edge_count += 1
+            edge12 = succ[ent1].get(ent2)
+            c12 = universal if edge12 is None else edge12['constraint']
+            heads, tails = third_nodes(ent1, ent2)
+            for ent3 in heads:
+                edge23 = succ[ent2].get(ent3)
+                tighten(ent1, ent3, compose(c12, universal if edge23 is None else edge23['constraint']))
+            for ent3 in tails:
+                edge31 = succ[ent3].get(ent1)
+                tighten(ent3, ent2, compose(universal if edge31 is None else edge31['constraint'], c12))
+        if verbose:
+            print(f"Number of edges processed: {edge_count}")
+
+    def chordal_completion(self, verbose=False):
+        """Return a chordal completion (see min_fill_in_triangulation) of the undirected graph
+        whose edges connect the entities that are related by constraints other than the
+        universal one (i.e., other than all algebra elements).
+        :return: A tuple (chordal graph, list of fill-in edges), where the chordal graph is an
+        undirected networkx Graph of the entities.
+        """
+        universal = self.algebra.elements
+        graph = nx.Graph()
+        graph.add_nodes_from(self.nodes())
+        graph.add_edges_from((tail, head) for tail, head, cons in self.edges(data='constraint')
+                             if tail != head and cons != universal)
+        chordal, _, fill_edges = min_fill_in_triangulation(graph)
+        if verbose:
+            print(f"Fill-in: {len(fill_edges)} edges")
+            print(f"Triangles: {sum(nx.triangles(chordal).values()) // 3}")
+        return chordal, fill_edges
+
+    def __propagate_ppc(self, verbose):
+        """Partial path consistency: propagate only over the triangles of a chordal completion
+        of the network's constraint graph (see chordal_completion).  The constraints on pairs
+        of entities that are not adjacent in the completion are left as they are."""
+        chordal, _ = self.chordal_completion(verbose)
+        nbrs = {entity: set(chordal[entity]) for entity in chordal}
+
+        def third_nodes(ent1, ent2):
+            common = list((nbrs[ent1] & nbrs[ent2]) | {ent1, ent2})
+            return common, common
+
+        edges = [(entity, entity) for entity in self.nodes() if self.has_edge(entity, entity)]
+        edges += [pair for tail, head in chordal.edges() for pair in ((tail, head), (head, tail))]
+        self.__propagate_sparse(verbose, edges, third_nodes)
+
+    def __propagate_vectorized(self, verbose):
+        """Copy the constraints into an array of bit masks, propagate them with
+        vectorized_path_consistency, and copy them back."""
+        adj = self._adj
+        nodes = list(self.nodes())
+        fromint = self.algebra.elements_bitset.fromint
+        universal = self.algebra.elements
+        matrix = np.array([[int(self.__constraint_on(ent1, ent2)) for ent2 in nodes] for ent1 in nodes],
+                          dtype=self.algebra.mask_dtype).reshape(len(nodes), len(nodes))
+        try:
+            sweeps = vectorized_path_consistency(self.algebra, matrix)
+        finally:
+            for ent1, row in zip(nodes, matrix.tolist()):
+                for ent2, mask in zip(nodes, row):
+                    relset = fromint(mask)
+                    if ent2 in adj[ent1]:
+                        if self.__trail is not None and relset != adj[ent1][ent2]['constraint']:
+                            self.__record(ent1, ent2)
+                        adj[ent1][ent2]['constraint'] = relset
+                    elif relset != universal:
+                        self.add_edge(ent1, ent2, constraint=relset)
+        if verbose:
+            print(f"Number of iterations: {sweeps}")
+
+    def __propagate_points(self, verbose, reducer=None):
+        """Replace the constraints with those of the minimal network found by PointNetworkSolver,
+        either directly, or, for an interval network, via IntervalPointReducer (which is created,
+        unless one for this network is given)."""
+        if self.algebra.linear_point_relations:
+            solver = PointNetworkSolver(self)
+        else:
+            reducer = reducer or IntervalPointReducer(self)
+            solver = reducer.solver
+        if verbose:
+            print(f"Number of strongly connected components: {solver.num_components}")
+        if not solver.consistent:
+            raise InconsistentNetwork
+        adj = self._adj
+        if self.algebra.linear_point_relations:
+            constraints = solver.minimal_constraints()
+        else:
+            constraints = reducer.minimal_constraints()
+        fromint = self.algebra.elements_bitset.fromint
+        relsets = dict()
+        for ent1, ent2, mask in constraints:
+            relset = relsets.get(mask)
+            if relset is None:
+                relset = relsets[mask] = fromint(mask)
+            if ent2 in adj[ent1]:
+                if self.__trail is not None and relset != adj[ent1][ent2]['constraint']:
+                    self.__record(ent1, ent2)
+                adj[ent1][ent2]['constraint'] = relset
+            else:
+                self.add_edge(ent1, ent2, constraint=relset)
+
     def summary(self, show_all=False):
         """Prints a summary of the network and its nodes/classes, edges, & constraints.
         By default, converse edges are not shown,  That is, if edge A-->B is shown,
@@ -732,9 +1865,34 @@ class Network(nx.DiGraph):
                         reverse_edges.add((tail.name, head.name))  # Remember the reverse of this edge
         return net_dict
 
+    def to_matrix(self):
+        """Return a ConstraintMatrix containing the same entities and constraints as this network."""
+        return ConstraintMatrix.from_network(self)
+
     def mostly_copy(self):
         """Returns a mostly deep copy of the network, except for the Algebra, which is shared."""
-        return Network(algebra=self.algebra, network_dict=self.to_dict())
+        return Network(algebra=self.algebra, network_dict=self.to_dict(), sparse=self.sparse)
+
+    def clone(self):
+        """Returns a copy of the network that shares the Algebra, and the (immutable) relation
+        sets on its edges, with this network.  Unlike mostly_copy, nothing is converted to
+        or from strings: each entity is copied as is, and the edges are copied directly into
+        the new network's adjacency structures."""
+        new_net = Network(self.algebra, self.name, sparse=self.sparse)
+        new_net.description = self.description
+        entities = dict()
+        for entity in self._node:
+            entities[entity] = copy.copy(entity)
+            entities[entity].classes = list(entity.classes)
+        new_net.add_nodes_from(entities.values())
+        new_succ = new_net._succ
+        new_pred = new_net._pred
+        for tail, nbrs in self._succ.items():
+            new_tail = entities[tail]
+            for head, data in nbrs.items():
+                new_head = entities[head]
+                new_succ[new_tail][new_head] = new_pred[new_head][new_tail] = data.copy()
+        return new_net
 
     def next_singleton_labelings(self):
         """Expands the first edge it comes across with multiple relations into
@@ -753,16 +1911,24 @@ class Network(nx.DiGraph):
 
     def all_singleton_labelings(self):
         """Returns a list of networks that represent all of the singleton labelings of this network."""
-        def exp_aux(in_work, result):
-            if len(in_work) == 0:
-                return result
-            else:
+        return list(self.iter_singleton_labelings())
+
+    def iter_singleton_labelings(self, limit=None):
+        """Generate the networks that represent the singleton labelings of this network, one at
+        a time, stopping after 'limit' of them, if a limit is given.  Only the partially expanded
+        networks along the current path of the expansion are held in memory.  The labelings come
+        in the same order as all_singleton_labelings has always returned them: the edges are
+        expanded in network order (see next_singleton_labelings), and the last relation on an
+        edge is expanded first."""
+        def expand():
+            in_work = [self]
+            while in_work:
                 next_net = in_work.pop()
                 if next_net.has_only_singleton_constraints():
-                    return exp_aux(in_work, result + [next_net])
+                    yield next_net
                 else:
-                    return exp_aux(next_net.next_singleton_labelings() + in_work, result)
-        return exp_aux([self], [])
+                    in_work.extend(next_net.next_singleton_labelings())
+        return islice(expand(), limit)
 
     def has_only_singleton_constraints(self):
         """Returns True if all constraints consist of single relations."""
@@ -775,8 +1941,70 @@ class Network(nx.DiGraph):
         return answer
 
     def consistent_singleton_labelings(self):
-        """Returns the list of networks representing all consistent singleton labelings of this network."""
-        return [network for network in self.all_singleton_labelings() if network.propagate()]
+        """Returns the list of networks representing all consistent singleton labelings of this
+        network, each of which has been propagated.  The labelings are found by a backtracking
+        search (see __search_singleton_labelings), in which the relations on the first edge to
+        be labeled vary slowest."""
+        return list(self.iter_consistent_singleton_labelings())
+
+    def iter_consistent_singleton_labelings(self, limit=None):
+        """Generate the consistent singleton labelings of this network, as described in
+        consistent_singleton_labelings, one at a time, stopping after 'limit' of them, if a
+        limit is given."""
+        return islice(self.__search_singleton_labelings(), limit)
+
+    def __search_singleton_labelings(self):
+        """Generate the consistent singleton labelings of this network by assigning a single
+        relation to one (multi-relation) edge at a time and propagating the consequences
+        (forward checking) before moving on to the next edge, so that any choice that makes
+        the network inconsistent is abandoned immediately.  The edges are labeled in the
+        order they appear in the network, and the relations on an edge in algebra order.
+        The search works on a single copy of the network, undoing each choice with rollback
+        (see checkpoint), and only copies the labelings that it finds."""
+        work = self.clone()
+        if not work.propagate():
+            return
+        # Labeling an edge also labels its converse, so only one of each pair is searched
+        branch_names = []
+        seen = set()
+        for tail, head, cons in self.edges(data='constraint'):
+            if len(cons) > 1 and (head.name, tail.name) not in seen:
+                branch_names.append((tail.name, head.name))
+                seen.add((tail.name, head.name))
+        branch_edges = [tuple(work.get_entities(names)) for names in branch_names]
+
+        def next_branch(index):
+            """Skip over the edges that propagation has already reduced to a single relation."""
+            while index < len(branch_edges) and len(work.__constraint_on(*branch_edges[index])) == 1:
+                index += 1
+            return index
+
+        def choices(index):
+            return index, iter(list(work.__constraint_on(*branch_edges[index])))
+
+        index = next_branch(0)
+        if index == len(branch_edges):
+            yield work
+            return
+        # Each frame is an edge and the relations on it that remain to be tried.  A checkpoint
+        # is in effect for the choice made in each frame but the last.
+        frames = [choices(index)]
+        while frames:
+            index, rels = frames[-1]
+            rel = next(rels, None)
+            if rel is None:
+                frames.pop()
+                if frames:
+                    work.rollback()
+                continue
+            work.checkpoint()
+            if work.assert_constraint(*branch_edges[index], work.algebra.relset(rel)):
+                next_index = next_branch(index + 1)
+                if next_index < len(branch_edges):
+                    frames.append(choices(next_index))
+                    continue
+                yield work.clone()
+            work.rollback()
 
     def get_submatrix_constraints(self, rows, cols, entity_name_list):
         """Treating the Network as a constraint matrix, return the sub-matrix corresponding
@@ -786,7 +2014,7 @@ class Network(nx.DiGraph):
         result = []
         for row in rows:
             for col in cols:
-                result.append(str(self.edges[entities[row], entities[col]]['constraint']))
+                result.append(str(self.__constraint_on(entities[row], entities[col])))
         return result
 
     def get_2x2_partition_constraints(self, startrow, startcol, name_list):
@@ -796,6 +2024,658 @@ class Network(nx.DiGraph):
         return ','.join(result)
 
 
+def propagate_component(algebra, task):
+    """Create a network from a task, as created by Network.propagate for each connected
+    component of a network, i.e., (name, sparse, method, [(entity name, classes), ...],
+    [(tail index, head index, constraint bit mask), ...]), and propagate it.
+    :return: (True if the network is consistent, its edges, as in the task, the entities' classes)
+    """
+    name, sparse, method, nodes, edges = task
+    net = Network(algebra, name, sparse=sparse)
+    entities = [class_type_dict[classes[0]](list(classes), entity_name) for entity_name, classes in nodes]
+    net.add_nodes_from(entities)
+    fromint = algebra.elements_bitset.fromint
+    net.add_edges_from((entities[i], entities[j], {'constraint': fromint(mask)}) for i, j, mask in edges)
+    consistent = net.propagate(method=method)
+    index = {entity: i for i, entity in enumerate(entities)}
+    return (consistent,
+            [(index[tail], index[head], int(relset)) for tail, head, relset in net.edges(data='constraint')],
+            [entity.classes for entity in entities])
+
+
+# The algebra used by propagate_component in each worker process
+_propagation_algebra = None
+
+
+def _init_propagation_worker(algebra_dict):
+    global _propagation_algebra
+    _propagation_algebra = algebra_registry.intern(algebra_dict)
+
+
+def _propagate_component_worker(task):
+    return propagate_component(_propagation_algebra, task)
+
+
+class ConstraintMatrix:
+    """A dense alternative to Network.  The constraints are stored as bit masks (see the
+    Algebra's mask_dtype) in an n-by-n NumPy array of unsigned integers, and the entities
+    are mapped to the row/column indices of that array.  Unlike a Network, pairs of
+    entities without an explicit constraint simply hold all of the algebra's elements.
+    A Network (i.e., a networkx DiGraph) can be produced from it on demand."""
+
+    def __init__(self, algebra, entities=(), name=None, description="undefined"):
+        self.algebra = algebra
+        self.name = make_name(name)
+        self.description = description
+        self.entities = []
+        self.index = dict()  # key:value = entity:row/column index
+        self.__name_index = dict()  # key:value = entity name:row/column index
+        self.__universal = int(algebra.elements)
+        # The matrix grows by doubling, so its capacity may exceed the number of entities
+        self.__matrix = np.zeros((0, 0), dtype=algebra.mask_dtype)
+        for entity in entities:
+            self.add_entity(entity)
+
+    def __str__(self):
+        return f"<ConstraintMatrix--{self.name}--{self.algebra.name}>"
+
+    def __len__(self):
+        return len(self.entities)
+
+    @property
+    def matrix(self):
+        """The n-by-n array of constraint bit masks, where n is the number of entities."""
+        n = len(self.entities)
+        return self.__matrix[:n, :n]
+
+    @classmethod
+    def from_network(cls, network):
+        """Create a ConstraintMatrix from a Network."""
+        cmat = cls(network.algebra, network.nodes, network.name,
+                   getattr(network, "description", "undefined"))
+        for tail, head, relset in network.edges(data='constraint'):
+            cmat.__matrix[cmat.index[tail], cmat.index[head]] = int(relset)
+        return cmat
+
+    def to_network(self):
+        """Return a Network containing the same entities and constraints as this matrix."""
+        net = Network(self.algebra, self.name)
+        net.description = self.description
+        fromint = self.algebra.elements_bitset.fromint
+        rows = self.matrix.tolist()
+        net.add_nodes_from(self.entities)
+        net.add_edges_from((tail, head, {'constraint': fromint(rows[i][j])})
+                           for i, tail in enumerate(self.entities)
+                           for j, head in enumerate(self.entities))
+        return net
+
+    def add_entity(self, entity):
+        """Add an entity, unconstrained wrt the other entities, and return its index.
+        If the entity is already in the matrix, just return its index."""
+        if entity in self.index:
+            return self.index[entity]
+        if entity.name in self.__name_index:
+            raise ValueError(f"An entity named '{entity.name}' is already in {self}")
+        idx = len(self.entities)
+        if idx == self.__matrix.shape[0]:
+            capacity = max(8, 2 * idx)
+            grown = np.full((capacity, capacity), self.__universal, dtype=self.algebra.mask_dtype)
+            grown[:idx, :idx] = self.__matrix[:idx, :idx]
+            self.__matrix = grown
+        self.entities.append(entity)
+        self.index[entity] = idx
+        self.__name_index[entity.name] = idx
+        # Each entity must equal itself
+        eq_rels = reduce(lambda r, s: r.union(s),
+                         map(self.algebra.get_domain_or_range_equality_rel, entity.classes))
+        self.__matrix[idx, idx] = int(eq_rels)
+        return idx
+
+    def add_constraint(self, entity1, entity2, relation_set=None):
+        """Set the constraint from entity1 to entity2, and its converse from entity2 to entity1.
+        The relation set can be None (i.e., all elements), a string like 'B|M|O', or a RelSet."""
+        idx1 = self.add_entity(entity1)
+        idx2 = self.add_entity(entity2)
+        rel_set = self.algebra.relset(relation_set) if relation_set else self.algebra.elements
+        self.__matrix[idx1, idx2] = int(rel_set)
+        self.__matrix[idx2, idx1] = int(self.algebra.converse(rel_set))
+
+    def get_entity(self, name):
+        """Return the entity with the input name, or None if there isn't one."""
+        idx = self.__name_index.get(name)
+        return None if idx is None else self.entities[idx]
+
+    def get_relset(self, tail_name, head_name):
+        """Return the constraint (RelSet) from the tail entity to the head entity."""
+        mask = self.__matrix[self.__name_index[tail_name], self.__name_index[head_name]]
+        return self.algebra.elements_bitset.fromint(int(mask))
+
+    def get_constraint(self, tail_name, head_name):
+        """Return the constraint, as a string, from the tail entity to the head entity."""
+        return str(self.get_relset(tail_name, head_name))
+
+    def to_list(self, entities=None):
+        """Return the constraints as a list of rows of strings, optionally ordered by the
+        input list of entities."""
+        fromint = self.algebra.elements_bitset.fromint
+        if entities:
+            indices = [self.index[entity] for entity in entities]
+            rows = self.__matrix[np.ix_(indices, indices)].tolist()
+        else:
+            rows = self.matrix.tolist()
+        return [[str(fromint(mask)) for mask in row] for row in rows]
+
+    def propagate(self, verbose=False, method="queue"):
+        """Propagate the constraints in the matrix.
+        :param verbose: If True, then the amount of work required is printed
+        :param method: "queue" (default) uses the same queue-based algorithm (PC-2) as
+        Network.propagate(method="queue"), but operating on rows of integer masks;
+        "vectorized" uses vectorized_path_consistency.  Both arrive at the same matrix.
+        :return: True if the network is consistent, otherwise False
+        """
+        if method == "queue":
+            propagation_method = self.__propagate_queue
+        elif method == "vectorized":
+            propagation_method = self.__propagate_vectorized
+        else:
+            raise ValueError(f"Unknown propagation method: {method}")
+        try:
+            propagation_method(verbose)
+        except InconsistentNetwork:
+            if verbose:
+                print(f"Propagation suspended; the network is inconsistent.")
+            return False
+        self.__update_entity_classes()
+        return True
+
+    def __update_entity_classes(self):
+        """Update the entity classes to reflect changes due to constraint propagation."""
+        fromint = self.algebra.elements_bitset.fromint
+        for idx, entity in enumerate(self.entities):
+            entity.classes = list(self.algebra.get_domain_classes(fromint(int(self.__matrix[idx, idx]))))
+
+    @staticmethod
+    def propagate_batch(cmats):
+        """Propagate many ConstraintMatrices, which must share an algebra, with
+        batch_path_consistency, stacking those with the same number of entities into one array.
+        The result for each matrix is the same as that of its own propagate(method="vectorized").
+        :return: A list with True for each matrix that's consistent, otherwise False
+        """
+        consistent = [True] * len(cmats)
+        by_size = dict()  # key:value = number of entities:indices into cmats
+        for i, cmat in enumerate(cmats):
+            if cmat.algebra is not cmats[0].algebra:
+                raise ValueError(f"{cmat} and {cmats[0]} have different algebras")
+            by_size.setdefault(len(cmat), []).append(i)
+        for indices in by_size.values():
+            matrices = np.stack([cmats[i].matrix for i in indices])
+            flags = batch_path_consistency(cmats[0].algebra, matrices)
+            for i, matrix, flag in zip(indices, matrices, flags.tolist()):
+                cmats[i].matrix[...] = matrix
+                consistent[i] = flag
+                if flag:
+                    cmats[i].__update_entity_classes()
+        return consistent
+
+    def assert_constraint(self, entity1, entity2, relation_set, verbose=False):
+        """Add a constraint to a matrix that has already been propagated, and propagate its
+        consequences incrementally, as in Network.assert_constraint.
+        :return: True if the network is still consistent, otherwise False
+        """
+        changed_edges = []
+        for entity in {entity1, entity2}:
+            if entity not in self.index:
+                idx = self.add_entity(entity)
+                changed_edges.append((idx, idx))
+                changed_edges += self.algebra.universal_edges_to_requeue(idx, range(len(self.entities)))
+        idx1 = self.index[entity1]
+        idx2 = self.index[entity2]
+        rel_set = self.algebra.relset(relation_set) if relation_set else self.algebra.elements
+        old_mask = int(self.__matrix[idx1, idx2])
+        new_mask = old_mask & int(rel_set)
+        if new_mask != old_mask:
+            self.__matrix[idx1, idx2] = new_mask
+            self.__matrix[idx2, idx1] = self.algebra.converse_mask(new_mask)
+            changed_edges += [(idx1, idx2), (idx2, idx1)]
+        try:
+            if not new_mask:
+                raise InconsistentNetwork
+            self.__propagate_rows(verbose, changed_edges)
+        except InconsistentNetwork:
+            if verbose:
+                print(f"Propagation suspended; the network is inconsistent.")
+            return False
+        self.__update_entity_classes()
+        return True
+
+    def __propagate_rows(self, verbose, edges):
+        """PC-2 starting from the given (row, column) pairs, where each pair, (i, j), taken
+        from the queue tightens all of row i and all of column j at once, using compose_many.
+        Unlike __propagate_queue, the work done does not depend on the size of the matrix,
+        other than the lengths of the rows & columns touched."""
+        matrix = self.matrix
+        compose_many = self.algebra.compose_many
+        queue = deque(edges)
+        queued = set(queue)
+        edge_count = 0
+        while queue:
+            i, j = queue.popleft()
+            queued.discard((i, j))
+            edge_count += 1
+            c_ij = matrix[i, j]
+            # Tighten i --> k using i --> j --> k, for every k
+            row = matrix[i] & compose_many(c_ij, matrix[j])
+            changed = np.flatnonzero(row != matrix[i])
+            if changed.size:
+                if not row[changed].all():
+                    raise InconsistentNetwork
+                matrix[i] = row
+                for k in changed.tolist():
+                    if (i, k) not in queued:
+                        queue.append((i, k))
+                        queued.add((i, k))
+            # Tighten k --> j using k --> i --> j, for every k
+            col = matrix[:, j] & compose_many(matrix[:, i], c_ij)
+            changed = np.flatnonzero(col != matrix[:, j])
+            if changed.size:
+                if not col[changed].all():
+                    raise InconsistentNetwork
+                matrix[:, j] = col
+                for k in changed.tolist():
+                    if (k, j) not in queued:
+                        queue.append((k, j))
+                        queued.add((k, j))
+        if verbose:
+            print(f"Number of edges processed: {edge_count}")
+
+    def __propagate_queue(self, verbose):
+        """PC-2 on the rows of the matrix, as lists of ints."""
+        compose = self.algebra.compose_masks
+        n = len(self.entities)
+        rows = self.matrix.tolist()
+        universal = self.__universal
+        skip_universal = (compose(universal, universal) == universal)
+        queue = deque((i, j) for i in range(n) for j in range(n)
+                      if not (skip_universal and rows[i][j] == universal))
+        queued = set(queue)
+        edge_count = 0
+        try:
+            while queue:
+                i, j = queue.popleft()
+                queued.discard((i, j))
+                edge_count += 1
+                row_i = rows[i]
+                row_j = rows[j]
+                c_ij = row_i[j]
+                for k in range(n):
+                    # Tighten i --> k using i --> j --> k
+                    c_ik = row_i[k]
+                    prod = c_ik & compose(c_ij, row_j[k])
+                    if prod != c_ik:
+                        if not prod:
+                            raise InconsistentNetwork
+                        row_i[k] = prod
+                        if (i, k) not in queued:
+                            queue.append((i, k))
+                            queued.add((i, k))
+                    # Tighten k --> j using k --> i --> j
+                    row_k = rows[k]
+                    c_kj = row_k[j]
+                    prod = c_kj & compose(row_k[i], c_ij)
+                    if prod != c_kj:
+                        if not prod:
+                            raise InconsistentNetwork
+                        row_k[j] = prod
+                        if (k, j) not in queued:
+                            queue.append((k, j))
+                            queued.add((k, j))
+        finally:
+            self.__matrix[:n, :n] = rows
+        if verbose:
+            print(f"Number of edges processed: {edge_count}")
+
+    def __propagate_vectorized(self, verbose):
+        """Propagate the constraints with vectorized_path_consistency."""
+        sweeps = vectorized_path_consistency(self.algebra, self.matrix)
+        if verbose:
+            print(f"Number of iterations: {sweeps}")
+
+
+class PointNetworkSolver:
+    """Solves a Network over a linear point algebra (i.e., one with the relations <, =, and >;
+    see Algebra.linear_point_relations) as a graph problem, instead of by path consistency.
+    Each constraint that implies 'x <= y' becomes an edge from x to y, which is strict if
+    the constraint implies 'x < y'.  The network is consistent iff no strongly connected
+    component (SCC) of that graph, whose entities must all be equal, contains a strict edge,
+    or a pair of entities constrained by '<|>'.  That takes time linear in the size of the
+    network, as does finding a solution.  If none of the constraints is '<|>' (i.e., all of
+    them are convex), then the minimal network, which path consistency also arrives at, is
+    given by reachability between the SCCs: x < y if there's a path from x to y through a
+    strict edge, x <= y if there's some other path, and so on."""
+
+    def __init__(self, network):
+        algebra = network.algebra
+        if not algebra.linear_point_relations:
+            raise ValueError(f"{algebra.name} is not a linear point algebra")
+        lt, eq, gt = (int(algebra.relset(rel)) for rel in algebra.linear_point_relations)
+        self.masks = (lt, eq, gt, lt | eq, eq | gt, lt | gt | eq)
+        self.network = network
+        self.consistent = True
+        # The 'x <= y' graph, where each edge is True if it's strict, i.e., 'x < y'
+        graph = nx.DiGraph()
+        graph.add_nodes_from(network.nodes)
+        self.disequalities = []
+        for tail, head, relset in network.edges(data='constraint'):
+            mask = int(relset)
+            if not mask:
+                self.consistent = False
+            elif mask == lt | gt:
+                self.disequalities.append((tail, head))
+            elif not mask & gt:
+                graph.add_edge(tail, head, strict=graph.edges.get((tail, head), {}).get('strict', False)
+                               or not mask & eq)
+            elif not mask & lt:
+                graph.add_edge(head, tail, strict=graph.edges.get((head, tail), {}).get('strict', False)
+                               or not mask & eq)
+        # Number the SCCs in topological order
+        condensed = nx.condensation(graph)
+        order = {comp: index for index, comp in enumerate(nx.topological_sort(condensed))}
+        self.num_components = len(order)
+        self.component = {entity: order[comp] for entity, comp in condensed.graph['mapping'].items()}
+        self.members = [[] for _ in range(self.num_components)]
+        for entity, comp in self.component.items():
+            self.members[comp].append(entity)
+        # The edges between SCCs, where comp_succ[c][d] is True if any edge from c to d is strict
+        comp_succ = [dict() for _ in range(self.num_components)]
+        for tail, head, strict in graph.edges(data='strict'):
+            c, d = self.component[tail], self.component[head]
+            if c == d:
+                if strict:
+                    self.consistent = False
+            else:
+                comp_succ[c][d] = comp_succ[c].get(d, False) or strict
+        if any(self.component[tail] == self.component[head] for tail, head in self.disequalities):
+            self.consistent = False
+        self.__comp_succ = comp_succ
+        self.__reach = None
+
+    @staticmethod
+    def is_convex(network):
+        """Return True if none of the network's constraints is '<|>', so that its minimal
+        network can be found by PointNetworkSolver."""
+        lt, eq, gt = (int(network.algebra.relset(rel)) for rel in network.algebra.linear_point_relations)
+        return all(int(relset) != lt | gt for _, _, relset in network.edges(data='constraint'))
+
+    def solution(self):
+        """Return a dictionary that assigns an integer (a time) to each entity so that every
+        constraint is satisfied, or None if the network is inconsistent."""
+        if not self.consistent:
+            return None
+        return dict(self.component)
+
+    def __reachability(self):
+        """Return a pair of lists of bit sets (ints) over the SCCs, where the first holds the
+        SCCs reachable from each SCC, and the second those reachable through a strict edge."""
+        if self.__reach is None:
+            reach = [0] * self.num_components
+            strict_reach = [0] * self.num_components
+            for c in reversed(range(self.num_components)):
+                for d, strict in self.__comp_succ[c].items():
+                    reach[c] |= (1 << d) | reach[d]
+                    strict_reach[c] |= ((1 << d) | reach[d]) if strict else strict_reach[d]
+            self.__reach = (reach, strict_reach)
+        return self.__reach
+
+    def relation(self, entity1, entity2):
+        """Return the constraint (RelSet) from entity1 to entity2 in the minimal network."""
+        return self.network.algebra.elements_bitset.fromint(self.relation_mask(entity1, entity2))
+
+    def relation_mask(self, entity1, entity2):
+        """Return the bit mask of the constraint from entity1 to entity2 in the minimal network."""
+        if self.disequalities:
+            raise ValueError("The minimal network isn't given by reachability when there are '<|>' constraints")
+        lt, eq, gt, le, ge, universal = self.masks
+        reach, strict_reach = self.__reachability()
+        c, d = self.component[entity1], self.component[entity2]
+        if c == d:
+            mask = eq
+        elif reach[c] >> d & 1:
+            mask = lt if strict_reach[c] >> d & 1 else le
+        elif reach[d] >> c & 1:
+            mask = gt if strict_reach[d] >> c & 1 else ge
+        else:
+            mask = universal
+        return mask
+
+    def minimal_constraints(self):
+        """Generate (entity1, entity2, mask) for every pair of entities whose constraint in
+        the minimal network isn't universal, where mask is the constraint's bit mask."""
+        if self.disequalities:
+            raise ValueError("The minimal network isn't given by reachability when there are '<|>' constraints")
+        lt, eq, gt, le, ge, universal = self.masks
+        reach, strict_reach = self.__reachability()
+        for c, members in enumerate(self.members):
+            for ent1 in members:
+                for ent2 in members:
+                    yield ent1, ent2, eq
+            bits = reach[c]
+            while bits:
+                low = bits & -bits
+                d = low.bit_length() - 1
+                bits ^= low
+                strict = strict_reach[c] >> d & 1
+                for ent1 in members:
+                    for ent2 in self.members[d]:
+                        yield ent1, ent2, lt if strict else le
+                        yield ent2, ent1, gt if strict else ge
+
+
+# The definition of the Linear_Point_Algebra (see Algebras/Linear_Point_Algebra.json), which
+# IntervalPointReducer needs whether or not the Algebras directory can be found.
+linear_point_algebra_dict = {
+    "Name": "Linear_Point_Algebra",
+    "Description": "Linear Point Algebra",
+    "Relations": {
+        "<": {"Name": "LessThan", "Domain": ["Point"], "Range": ["Point"], "Converse": ">",
+              "Reflexive": False, "Symmetric": False, "Transitive": True},
+        "=": {"Name": "Equals", "Domain": ["Point"], "Range": ["Point"], "Converse": "=",
+              "Reflexive": True, "Symmetric": True, "Transitive": True},
+        ">": {"Name": "GreaterThan", "Domain": ["Point"], "Range": ["Point"], "Converse": "<",
+              "Reflexive": False, "Symmetric": False, "Transitive": True}
+    },
+    "TransTable": {
+        "<": {"<": "<", "=": "<", ">": "<|=|>"},
+        "=": {"<": "<", "=": "=", ">": ">"},
+        ">": {"<": "<|=|>", "=": ">", ">": ">"}
+    }
+}
+
+# key:value = algebra:its relations' signatures, or None (see IntervalPointReducer.point_signatures)
+_interval_point_signatures = weakref.WeakKeyDictionary()
+
+
+class IntervalPointReducer:
+    """Rewrites a Network over a linear interval algebra (i.e., one whose relations all have
+    a signature in name_signature_mapping) as a network over the Linear_Point_Algebra, that
+    relates the entities' start and end points, and solves it with PointNetworkSolver.  Each
+    interval constraint becomes four constraints between the endpoints: the unions, over the
+    constraint's relations, of the corresponding parts of their signatures.  That's only exact
+    if the constraint is pointisable, i.e., those four endpoint constraints, together, allow
+    no other interval relations, and, so that the point network's minimal network is given by
+    reachability, convex, i.e., none of the four is '<|>'.  A network is reducible if all of its
+    constraints are.  Then the minimal network of the interval network follows from that of
+    the point network, one pair of intervals at a time.  Otherwise, use the general engine."""
+
+    def __init__(self, network, point_algebra=None):
+        self.network = network
+        self.point_algebra = point_algebra or algebra_registry.intern(linear_point_algebra_dict)
+        self.point_masks = {rel: int(self.point_algebra.relset(rel)) for rel in self.point_algebra.elements}
+        self.signatures = self.point_signatures(network.algebra)
+        if self.signatures is None:
+            raise ValueError(f"{network.algebra.name} is not a linear interval algebra")
+        self.__endpoint_masks = dict()  # key:value = interval relset mask:endpoint constraint masks
+        self.__relation_masks = dict()  # key:value = endpoint constraint masks:interval relset mask
+        self.reducible = all(self.__pointise(relset) is not None
+                             for tail, head, relset in network.edges(data='constraint') if tail is not head)
+        self.__solver = None
+
+    @staticmethod
+    def point_signatures(algebra):
+        """If the algebra is a linear interval algebra, return a dictionary of each relation's
+        signature, as a tuple of its four linear point relations, otherwise return None.  The
+        signatures are found by the relations' names (see name_signature_mapping), so, in case
+        an algebra uses those names to mean something else, the algebra only qualifies if its
+        converses and compositions are the ones that the signatures imply.  The result for each
+        algebra is cached."""
+        signatures = _interval_point_signatures.get(algebra, False)
+        if signatures is False:
+            signatures = _interval_point_signatures[algebra] = IntervalPointReducer.__find_signatures(algebra)
+        return signatures
+
+    @staticmethod
+    def __find_signatures(algebra):
+        classes = set(algebra.equality_relations_dict)
+        if not classes <= {"Point", "ProperInterval"}:
+            return None
+        signatures = {rel: tuple(name_signature_mapping.get(rel, ())) for rel in algebra.elements}
+        if not all(len(sig) == 4 and set(sig) <= {'<', '=', '>'} for sig in signatures.values()):
+            return None
+        # The converse of A r B is B r' A, so its signature swaps the middle two point relations
+        # and reverses all four.
+        flip = {'<': '>', '=': '=', '>': '<'}
+        for rel, (ss, se, es, ee) in signatures.items():
+            if signatures[algebra.converse(rel)] != (flip[ss], flip[es], flip[se], flip[ee]):
+                return None
+        point_algebra = algebra_registry.intern(linear_point_algebra_dict)
+        less_than = '|'.join(rel for rel, cls in (('=', "Point"), ('<', "ProperInterval")) if cls in classes)
+        table = derive_composition_table_by_orderings(point_algebra, less_than, list(signatures))
+        for rel1, row in table.items():
+            for rel2, comp in row.items():
+                comp_rels = comp.split('|') if comp else []
+                if (not set(comp_rels) <= signatures.keys() or
+                        algebra.relset(comp_rels) != algebra.transitivity_table[rel1][rel2]):
+                    return None
+        return signatures
+
+    @classmethod
+    def for_network(cls, network):
+        """Return an IntervalPointReducer for the network, if it's reducible (see is_reducible),
+        otherwise None."""
+        if cls.point_signatures(network.algebra) is None:
+            return None
+        reducer = cls(network)
+        return reducer if reducer.reducible else None
+
+    @classmethod
+    def is_reducible(cls, network):
+        """Return True if the network is over a linear interval algebra, and all of its
+        constraints are convex and pointisable."""
+        return cls.for_network(network) is not None
+
+    def __endpoint_mask(self, relset, index):
+        """Return the union of the linear point relations in the index-th place of the
+        signatures of the relations in relset, as a bit mask."""
+        return reduce(lambda mask, rel: mask | self.point_masks[self.signatures[rel][index]], relset, 0)
+
+    def __pointise(self, relset):
+        """Return the bit masks of the four endpoint constraints implied by the interval
+        constraint, relset, or None if it's not convex and pointisable."""
+        key = int(relset)
+        if key not in self.__endpoint_masks:
+            masks = tuple(self.__endpoint_mask(relset, index) for index in range(4))
+            fitting = [rel for rel, sig in self.signatures.items()
+                       if all(self.point_masks[point_rel] & mask for point_rel, mask in zip(sig, masks))]
+            not_equal = self.point_masks['<'] | self.point_masks['>']
+            convex_pointisable = len(fitting) == len(relset) and not_equal not in masks
+            self.__endpoint_masks[key] = masks if convex_pointisable else None
+        return self.__endpoint_masks[key]
+
+    @property
+    def solver(self):
+        """The PointNetworkSolver for the point network (see point_network)."""
+        if self.__solver is None:
+            self.__solver = PointNetworkSolver(self.point_network())
+        return self.__solver
+
+    def point_network(self):
+        """Create the (sparse) point network, over the entities' start and end points, stored
+        in the endpoints dictionary, where key:value = entity:(start point, end point)."""
+        if not self.reducible:
+            raise ValueError(f"{self.network.name} can't be reduced to a point network")
+        fromint = self.point_algebra.elements_bitset.fromint
+        universal = int(self.point_algebra.elements)
+        adj = self.network.adj
+        self.endpoints = {entity: (TemporalEntity(["Point"], entity.name + ".start"),
+                                   TemporalEntity(["Point"], entity.name + ".end"))
+                          for entity in self.network.nodes}
+        net = Network(self.point_algebra, self.network.name + ":points", sparse=True)
+        # The constraint between an interval's endpoints follows from its equality relations
+        for entity, (start, end) in self.endpoints.items():
+            if entity in adj[entity]:
+                eq_relset = adj[entity][entity]['constraint']
+            else:
+                eq_relset = reduce(lambda r, s: r.union(s),
+                                   map(self.network.algebra.get_domain_or_range_equality_rel, entity.classes))
+            net.add_constraint(start, end, fromint(self.__endpoint_mask(eq_relset, 1)))
+        for tail, head, relset in self.network.edges(data='constraint'):
+            if tail is not head:
+                tail_start, tail_end = self.endpoints[tail]
+                head_start, head_end = self.endpoints[head]
+                for (point1, point2), mask in zip([(tail_start, head_start), (tail_start, head_end),
+                                                   (tail_end, head_start), (tail_end, head_end)],
+                                                  self.__pointise(relset)):
+                    if mask != universal:
+                        net.add_constraint(point1, point2, fromint(mask))
+        return net
+
+    def relation_mask(self, entity1, entity2):
+        """Return the bit mask of the constraint from entity1 to entity2 in the minimal network,
+        which holds the relations whose signatures fit the endpoint constraints in the point
+        network's minimal network."""
+        start1, end1 = self.endpoints[entity1]
+        start2, end2 = self.endpoints[entity2]
+        key = tuple(self.solver.relation_mask(point1, point2)
+                    for point1, point2 in [(start1, start2), (start1, end2), (end1, start2), (end1, end2),
+                                           (start1, end1), (start2, end2)])
+        mask = self.__relation_masks.get(key)
+        if mask is None:
+            mask = self.__relation_masks[key] = self.__fitting_relations(key)
+        return mask
+
+    def __fitting_relations(self, point_masks):
+        """Return the bit mask of the relations whose signatures fit the six endpoint constraints,
+        between the two intervals' endpoints, and within each interval, in point_masks.  Since
+        a path consistent network of convex point constraints is globally consistent, a relation
+        fits if some ordering of the four endpoints satisfies all six."""
+        point_rels = {-1: self.point_masks['<'], 0: self.point_masks['='], 1: self.point_masks['>']}
+        fitting = set()
+        for start1, end1, start2, end2 in product(range(4), repeat=4):
+            rels = [point_rels[(a > b) - (a < b)] for a, b in [(start1, start2), (start1, end2), (end1, start2),
+                                                               (end1, end2), (start1, end1), (start2, end2)]]
+            if all(rel & mask for rel, mask in zip(rels, point_masks)):
+                fitting.add(tuple(rels[:4]))
+        return int(self.network.algebra.relset(
+            [rel for rel, sig in self.signatures.items()
+             if tuple(self.point_masks[point_rel] for point_rel in sig) in fitting]))
+
+    def minimal_constraints(self):
+        """Generate (entity1, entity2, mask) for every pair of entities whose constraint in the
+        minimal network isn't universal, where mask is the constraint's bit mask.  If universal
+        constraints are inert (see Algebra.universal_is_absorbing), then only the pairs of
+        entities with related endpoints are examined, otherwise every pair is."""
+        universal = int(self.network.algebra.elements)
+        if self.network.algebra.universal_is_absorbing:
+            owner = {point: entity for entity, points in self.endpoints.items() for point in points}
+            pairs = dict.fromkeys((owner[point1], owner[point2])
+                                  for point1, point2, _ in self.solver.minimal_constraints())
+        else:
+            pairs = ((entity1, entity2) for entity1 in self.endpoints for entity2 in self.endpoints)
+        for entity1, entity2 in pairs:
+            mask = self.relation_mask(entity1, entity2)
+            if mask != universal:
+                yield entity1, entity2, mask
+
+
 # IMPORTANT: The only intended purpose of the class, FourPointNet, is to generate point-based
 # representations of interval relations using the function, generate_consistent_networks.
 # It has no other intended purpose.
@@ -1057,15 +2937,121 @@ def derive_composition(point_algebra, eq_rel, rel1, rel2):
     return '|'.join(comps_list)
 
 
-def derive_composition_table(point_algebra, less_than_rel, relations_list):
+def derive_composition_table(point_algebra, less_than_rel, relations_list, workers=None):
+    """Derive the composition of every pair of relations in relations_list.  If workers is
+    greater than 1, then the compositions are spread, in chunks, across that many processes.
+    Either way, the resulting table is the same."""
+    pairs = [(r1, r2) for r1 in relations_list for r2 in relations_list]
+    if workers and workers > 1:
+        chunksize = max(1, len(pairs) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_derivation_worker,
+                                 initargs=(point_algebra.algebra_dict, less_than_rel)) as executor:
+            # map returns the results in the same order as the pairs
+            comps = list(executor.map(_derive_composition_worker, pairs, chunksize=chunksize))
+    else:
+        comps = [derive_composition(point_algebra, less_than_rel, r1, r2) for r1, r2 in pairs]
+    trans_dict = dict()
+    for (r1, r2), comp in zip(pairs, comps):
+        trans_dict.setdefault(r1, dict())[r2] = comp
+    return trans_dict
+
+
+def extend_point_ordering(point_algebra, constraints, assignment=None):
+    """Generate every consistent way of extending an assignment of single point relations to
+    pairs of points, so that it also covers the pairs in constraints, where constraints maps
+    each pair of points, (i, j), to the relation set it's restricted to, and assignment maps
+    each pair that's already decided, (i, j), to a relation name.  An assignment is consistent
+    if every triangle of points in it is (i.e., Rij is in Rik;Rkj), which is the test that
+    propagate applies to a singleton labeling.  Each extended assignment is yielded as a new
+    dictionary, like the input assignment, that includes the pairs in constraints."""
+    table = point_algebra.transitivity_table
+    converse = point_algebra.converse
+    assignment = dict(assignment or dict())
+    rels = dict()
+    for (i, j), rel in assignment.items():
+        rels[i, j] = rel
+        rels[j, i] = converse(rel)
+    pairs = list(constraints)
+    points = sorted({point for pair in pairs + list(assignment) for point in pair})
+
+    def consistent(i, j, rij):
+        for k in points:
+            if k != i and k != j and (i, k) in rels and (k, j) in rels:
+                rik = rels[i, k]
+                rkj = rels[k, j]
+                # Check the triangle from each of its three sides
+                if (rij not in table[rik][rkj] or rik not in table[rij][rels[j, k]] or
+                        rkj not in table[rels[k, i]][rij]):
+                    return False
+        return True
+
+    def search(index):
+        if index == len(pairs):
+            yield {**assignment, **{pair: rels[pair] for pair in pairs}}
+            return
+        i, j = pairs[index]
+        for rel in constraints[i, j]:
+            if consistent(i, j, rel):
+                rels[i, j] = rel
+                rels[j, i] = converse(rel)
+                yield from search(index + 1)
+        rels.pop((i, j), None)
+        rels.pop((j, i), None)
+
+    return search(0)
+
+
+def derive_composition_table_by_orderings(point_algebra, less_than_rel, relations_list):
+    """Derive the same table as derive_composition_table, without networks or propagation, by
+    enumerating the consistent orderings of the start and end points of three intervals, A, B,
+    and C, where A;B = C, directly.  The orderings of the points of A & B, and of B & C, are
+    found once for each relation, and each composition combines those that agree about B."""
+    less_than = point_algebra.relset(less_than_rel)
+    anything = point_algebra.elements
+    # Points 0 & 1, 2 & 3, and 4 & 5 are the start & end points of A, B, and C, respectively
+    result_pairs = [(0, 4), (0, 5), (1, 4), (1, 5)]
+
+    def orderings(rel, first, second):
+        c13, c14, c23, c24 = map(point_algebra.relset, name_signature_mapping[rel])
+        constraints = {(first, first + 1): less_than, (second, second + 1): less_than,
+                       (first, second): c13, (first, second + 1): c14,
+                       (first + 1, second): c23, (first + 1, second + 1): c24}
+        return list(extend_point_ordering(point_algebra, constraints))
+
+    ab_orderings = {rel: orderings(rel, 0, 2) for rel in relations_list}
+    bc_orderings = {rel: orderings(rel, 2, 4) for rel in relations_list}
     trans_dict = dict()
     for r1 in relations_list:
         trans_dict[r1] = dict()
         for r2 in relations_list:
-            trans_dict[r1][r2] = derive_composition(point_algebra, less_than_rel, r1, r2)
+            comps = set()
+            for ab_ordering in ab_orderings[r1]:
+                for bc_ordering in bc_orderings[r2]:
+                    if ab_ordering[2, 3] == bc_ordering[2, 3]:
+                        for ordering in extend_point_ordering(point_algebra,
+                                                              dict.fromkeys(result_pairs, anything),
+                                                              {**ab_ordering, **bc_ordering}):
+                            comps.add(signature_name_mapping[','.join(ordering[pair] for pair in result_pairs)])
+            trans_dict[r1][r2] = '|'.join(sorted(comps))
     return trans_dict
 
 
+# The point algebra and less-than relation used by each worker process of
+# derive_composition_table.  The algebra is rebuilt in each process from its dictionary.
+_derivation_point_algebra = None
+_derivation_less_than_rel = None
+
+
+def _init_derivation_worker(point_algebra_dict, less_than_rel):
+    global _derivation_point_algebra, _derivation_less_than_rel
+    _derivation_point_algebra = Algebra(alg_dict=point_algebra_dict)
+    _derivation_less_than_rel = less_than_rel
+
+
+def _derive_composition_worker(pair):
+    return derive_composition(_derivation_point_algebra, _derivation_less_than_rel, *pair)
+
+
 # def is_transitive(rel_name, pt_alg, less_than_rel):
 #     return rel_name == derive_composition(pt_alg, less_than_rel, rel_name, rel_name)
 
@@ -1114,20 +3100,107 @@ def derive_relation_dict(consistent_networks, transitivity_table):
     return dict(rel_dict)
 
 
-def derive_algebra(base_alg, less_than_rel, name=None, description=None, verbose=False):
-    base_nets = generate_consistent_networks(base_alg, lessthan=less_than_rel, verbose=verbose)
-    alg_rels_list = list(base_nets.keys())
-    alg_rels_list.sort()
-    comp_dict = derive_composition_table(base_alg, less_than_rel, alg_rels_list)
-    rels_dict = derive_relation_dict(base_nets, comp_dict)
+def derive_algebra(base_alg, less_than_rel, name=None, description=None, verbose=False,
+                   workers=None, by_orderings=None, cache_dir=None):
+    """Derive an interval algebra from a point algebra.  The composition table is derived by
+    derive_composition_table_by_orderings, in this process, or, if by_orderings is False, by
+    derive_composition_table, using the given number of worker processes.  If by_orderings
+    isn't given, then it's False if more than one worker is given, and True otherwise, so
+    that giving workers selects the network-based derivation, which is the only one that
+    uses them.  Giving more than one worker with by_orderings=True raises a ValueError.
+    If cache_dir is given, then the derived relations and composition table are cached in
+    that directory, which may be shared by several processes (see derived_algebra_cache_key)."""
+    parallel = bool(workers and workers > 1)
+    if by_orderings is None:
+        by_orderings = not parallel
+    elif by_orderings and parallel:
+        raise ValueError("workers is only used when by_orderings is False")
+
+    def derive():
+        base_nets = generate_consistent_networks(base_alg, lessthan=less_than_rel, verbose=verbose)
+        alg_rels_list = list(base_nets.keys())
+        alg_rels_list.sort()
+        if by_orderings:
+            comp_dict = derive_composition_table_by_orderings(base_alg, less_than_rel, alg_rels_list)
+        else:
+            comp_dict = derive_composition_table(base_alg, less_than_rel, alg_rels_list, workers=workers)
+        rels_dict = derive_relation_dict(base_nets, comp_dict)
+        return {"Relations": rels_dict, "TransTable": comp_dict}
+
+    if cache_dir:
+        derived = cached_derivation(cache_dir, derived_algebra_cache_key(base_alg, less_than_rel),
+                                    derive, verbose)
+    else:
+        derived = derive()
     alg_dict = dict()
     alg_dict["Name"] = name
     alg_dict["Description"] = description
-    alg_dict["Relations"] = rels_dict
-    alg_dict["TransTable"] = comp_dict
+    alg_dict["Relations"] = derived["Relations"]
+    alg_dict["TransTable"] = derived["TransTable"]
     return alg_dict
 
 
+# Change this whenever a change to the derivation could change the algebras it derives,
+# so that algebras cached by earlier versions are not used.
+DERIVED_ALGEBRA_CACHE_VERSION = 1
+
+
+def derived_algebra_cache_key(base_alg, less_than_rel):
+    """Return a hash of everything that an algebra derived from a point algebra depends on:
+    the point algebra's relations and composition table, and the less-than relation."""
+    content = {"Version": DERIVED_ALGEBRA_CACHE_VERSION,
+               "Relations": base_alg.algebra_dict["Relations"],
+               "TransTable": base_alg.algebra_dict["TransTable"],
+               "LessThan": str(base_alg.relset(less_than_rel))}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def read_cached_derivation(path, key):
+    """Return the derivation cached in the JSON file at path, or None if it's missing,
+    unreadable, or not the one for key."""
+    try:
+        with open(path, "r") as json_file:
+            cached = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("Key") != key:
+        return None
+    if "Relations" not in cached or "TransTable" not in cached:
+        return None
+    return cached
+
+
+def cached_derivation(cache_dir, key, derive, verbose=False):
+    """Return the derivation cached in cache_dir under key, or call derive to create it and
+    then cache it.  A single lock file, .lock, in cache_dir keeps several processes from
+    deriving the same thing at once, and each cache file is written to a temporary file
+    first and then renamed, so that a partially written file is never read."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + ".json")
+    cached = read_cached_derivation(path, key)
+    if cached is None:
+        with open(os.path.join(cache_dir, ".lock"), "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have finished deriving it while this one waited
+                cached = read_cached_derivation(path, key)
+                if cached is None:
+                    cached = dict(derive(), Key=key)
+                    temp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(temp_path, "w") as out:
+                        json.dump(cached, out, indent=4, separators=(',', ':'))
+                    os.replace(temp_path, path)
+                    if verbose:
+                        print(f"Cached derivation: {path}")
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    elif verbose:
+        print(f"Using cached derivation: {path}")
+    return cached
+
+
 def algebra_to_json_file(algebra, json_path):
     with open(json_path, "w") as out:
         json.dump(algebra, out, indent=4, separators=(',', ':'))